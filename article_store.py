@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+SQLite article store.
+Keeps the rows of database.csv and the records of contents.json in one
+table, deduplicated by normalized URL and indexed by ISO date. The database
+runs in WAL mode so json_to_html.py can read while merge.py writes.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dates import record_date
+from json_records import iter_records, write_records
+from url_index import normalize_url
+
+DEFAULT_STORE = "articles.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url_key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    date_iso TEXT,
+    database_seq INTEGER,
+    database_row TEXT,
+    contents_seq INTEGER,
+    contents_record TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_articles_date ON articles(date_iso, contents_seq);
+CREATE INDEX IF NOT EXISTS idx_articles_database_seq ON articles(database_seq);
+CREATE INDEX IF NOT EXISTS idx_articles_contents_seq ON articles(contents_seq);
+"""
+
+
+class ArticleStore:
+    """Article table with a UNIQUE normalized-URL key and a date index."""
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _next_seq(self, column: str) -> int:
+        row = self.connection.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM articles").fetchone()
+        return row[0]
+
+    def _add(self, url: str, date_iso: Optional[str], seq_column: str, payload_column: str, payload: str) -> bool:
+        key = normalize_url(url)
+        existing = self.connection.execute(
+            f"SELECT id, {payload_column} FROM articles WHERE url_key = ?", (key,)
+        ).fetchone()
+        if existing and existing[1] is not None:
+            return False
+        seq = self._next_seq(seq_column)
+        if existing:
+            # The rendered order follows the contents date, so it wins over the database row's
+            date_update = "?" if payload_column == 'contents_record' else "COALESCE(date_iso, ?)"
+            self.connection.execute(
+                f"UPDATE articles SET {seq_column} = ?, {payload_column} = ?, date_iso = {date_update} WHERE id = ?",
+                (seq, payload, date_iso, existing[0]),
+            )
+        else:
+            self.connection.execute(
+                f"INSERT INTO articles (url_key, url, date_iso, {seq_column}, {payload_column}) VALUES (?, ?, ?, ?, ?)",
+                (key, url, date_iso, seq, payload),
+            )
+        return True
+
+    def add_database_rows(self, rows: Iterable[Dict[str, str]]) -> int:
+        """Add database.csv rows whose URL is not stored yet; returns how many were added."""
+        added = 0
+        with self.connection:
+            for row in rows:
+                url = row.get('URL', '')
+                if url and self._add(url, record_date(row), 'database_seq', 'database_row', json.dumps(row, ensure_ascii=False)):
+                    added += 1
+        return added
+
+    def add_contents(self, records: Iterable[Dict]) -> int:
+        """Add contents.json records whose URL is not stored yet; returns how many were added."""
+        added = 0
+        with self.connection:
+            for record in records:
+                url = record.get('URL', '')
+                if url and self._add(url, record_date(record), 'contents_seq', 'contents_record', json.dumps(record, ensure_ascii=False)):
+                    added += 1
+        return added
+
+    def count_new(self, records: Iterable[Dict], payload_column: str) -> int:
+        """How many records an add_* call would add to payload_column, without writing."""
+        new_keys = set()
+        for record in records:
+            url = record.get('URL', '')
+            if not url:
+                continue
+            key = normalize_url(url)
+            existing = self.connection.execute(
+                f"SELECT {payload_column} FROM articles WHERE url_key = ?", (key,)
+            ).fetchone()
+            if existing is None or existing[0] is None:
+                new_keys.add(key)
+        return len(new_keys)
+
+    def refresh_dates(self) -> int:
+        """Recompute every date_iso from the stored payloads; returns how many changed."""
+        changed = 0
+        with self.connection:
+            rows = self.connection.execute(
+                "SELECT id, date_iso, database_row, contents_record FROM articles").fetchall()
+            for row_id, date_iso, database_row, contents_record in rows:
+                payload = contents_record or database_row
+                new_date = record_date(json.loads(payload)) if payload else None
+                if new_date != date_iso:
+                    self.connection.execute("UPDATE articles SET date_iso = ? WHERE id = ?", (new_date, row_id))
+                    changed += 1
+        return changed
+
+    def contains(self, url: str) -> bool:
+        row = self.connection.execute("SELECT 1 FROM articles WHERE url_key = ?", (normalize_url(url),)).fetchone()
+        return row is not None
+
+    def iter_database_rows(self) -> Iterator[Dict[str, str]]:
+        for (row,) in self.connection.execute(
+                "SELECT database_row FROM articles WHERE database_row IS NOT NULL ORDER BY database_seq"):
+            yield json.loads(row)
+
+    def iter_contents(self) -> Iterator[Dict]:
+        for (record,) in self.connection.execute(
+                "SELECT contents_record FROM articles WHERE contents_record IS NOT NULL ORDER BY contents_seq"):
+            yield json.loads(record)
+
+    def count_contents(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM articles WHERE contents_record IS NOT NULL").fetchone()[0]
+
+    def latest_contents(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Newest articles first, ties in merge order; undated articles come last
+        (SQLite sorts NULL lowest). This is the order json_to_html.py renders in.
+        """
+        query = ("SELECT contents_record FROM articles WHERE contents_record IS NOT NULL "
+                 "ORDER BY date_iso DESC, contents_seq")
+        if limit:
+            return [json.loads(record) for (record,) in self.connection.execute(query + " LIMIT ?", (limit,))]
+        return [json.loads(record) for (record,) in self.connection.execute(query)]
+
+    def contents_between(self, start: str, end: str) -> List[Dict]:
+        """Articles whose ISO date is within [start, end], oldest first."""
+        return [json.loads(record) for (record,) in self.connection.execute(
+            "SELECT contents_record FROM articles WHERE contents_record IS NOT NULL "
+            "AND date_iso BETWEEN ? AND ? ORDER BY date_iso, contents_seq", (start, end))]
+
+
+def import_files(store: ArticleStore, database_file: Optional[str], contents_file: Optional[str]) -> None:
+    """Import the current CSV/JSON files into the store, skipping URLs already present."""
+    if database_file and os.path.exists(database_file):
+        with open(database_file, 'r', encoding='utf-8', newline='') as f:
+            added = store.add_database_rows(csv.DictReader(f))
+        print(f"Imported {added} database rows from {database_file}")
+    if contents_file and os.path.exists(contents_file):
+        added = store.add_contents(iter_records(contents_file))
+        print(f"Imported {added} articles from {contents_file}")
+
+
+def export_files(store: ArticleStore, database_file: Optional[str], contents_file: Optional[str]) -> None:
+    """Write the store back out in the CSV/JSON file formats, in merge order."""
+    if database_file:
+        rows = store.iter_database_rows()
+        first = next(rows, None)
+        if first is not None:
+            temp_path = database_file + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(first.keys()), extrasaction='ignore')
+                writer.writeheader()
+                writer.writerow(first)
+                writer.writerows(rows)
+            os.replace(temp_path, database_file)
+            print(f"Exported database rows to {database_file}")
+    if contents_file:
+        count = write_records(contents_file, store.iter_contents())
+        print(f"Exported {count} articles to {contents_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import, export and query the SQLite article store",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python article_store.py import --database database.csv --contents contents.json
+  python article_store.py export --database database-export.csv --contents contents-export.json
+  python article_store.py latest -n 10
+  python article_store.py range --start 2025-08-01 --end 2025-08-31
+        """
+    )
+    parser.add_argument('command', choices=['import', 'export', 'latest', 'range'], help='Action to perform')
+    parser.add_argument(
+        '--store',
+        default=DEFAULT_STORE,
+        help=f'SQLite database file (default: {DEFAULT_STORE})'
+    )
+    parser.add_argument('--database', help='Database CSV file to import from / export to')
+    parser.add_argument('--contents', help='Contents .json/.jsonl file to import from / export to')
+    parser.add_argument('-n', type=int, default=10, help='Number of articles for latest (default: 10)')
+    parser.add_argument('--start', help='First ISO date for range')
+    parser.add_argument('--end', help='Last ISO date for range')
+    args = parser.parse_args()
+
+    if args.command in ('import', 'export') and not (args.database or args.contents):
+        print("Error: --database and/or --contents is required.")
+        sys.exit(1)
+    if args.command == 'range' and not (args.start and args.end):
+        print("Error: --start and --end are required for range.")
+        sys.exit(1)
+
+    store = ArticleStore(args.store)
+    try:
+        if args.command == 'import':
+            import_files(store, args.database, args.contents)
+        elif args.command == 'export':
+            export_files(store, args.database, args.contents)
+        else:
+            articles = store.latest_contents(args.n) if args.command == 'latest' else store.contents_between(args.start, args.end)
+            for article in articles:
+                print(f"{article.get('date', '')}\t{article.get('topic', '')}\t{article.get('URL', '')}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the merge, render and collection paths.
+Generates synthetic archives (database.csv + contents.json) of the requested
+sizes and a corpus of saved article pages under --data-dir, reusing them on
+later runs. Each case runs in a fresh interpreter so its peak memory is its
+own:
+  merge          - merge a daily batch (half new, half already archived)
+                   into a copy of the archive, first building the URL indexes
+                   from the archive (cold), then with the indexes in place (warm)
+  render         - json_to_html over the whole archive
+  render-recent  - json_to_html --size N over the whole archive
+  extract        - text extraction of the page corpus with each backend
+  collect        - collect_articles() against a local HTTP server serving
+                   RSS feeds and the page corpus
+Everything runs offline. Results are written as JSON; --compare reports the
+cases that got slower than a previous results file.
+"""
+
+import argparse
+import contextlib
+import csv
+import functools
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List
+
+from json_records import write_records
+
+DATA_DIR = "bench-data"
+RESULTS_FILE = "bench-results.json"
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_PAGES = 200
+DEFAULT_SOURCE_WORDS = 300
+DEFAULT_RECENT = 10
+DAILY_BATCH = 100
+FEEDS = 6
+DEFAULT_TOLERANCE = 0.2
+SEED = 42
+CASES = ("merge", "render", "render-recent", "extract", "collect")
+ARCHIVE_CASES = ("merge", "render", "render-recent")
+WORDS = ("""
+apple google openai model chip startup funding launch update privacy security cloud device battery
+robot software hardware network data center energy market users platform developer release feature
+report court policy screen camera app store search browser agent research quantum laptop phone
+""".split())
+
+
+# Synthetic data
+
+def _text(rng: random.Random, words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def synthetic_article(rng: random.Random, number: int, day: date, source_words: int) -> Dict:
+    paragraphs = [_text(rng, 60) + '.' for _ in range(max(source_words // 60, 1))]
+    return {
+        "date": day.isoformat(),
+        "URL": f"https://news{number % 7}.example.com/{day.year}/{day.month:02d}/story-{number}",
+        "topic": f"{_text(rng, 8).capitalize()} ({number})",
+        "source": "\n".join(paragraphs),
+        "summary": _text(rng, 80).capitalize() + '.',
+        "questions": [_text(rng, 10).capitalize() + '?' for _ in range(3)],
+    }
+
+
+def synthetic_articles(count: int, source_words: int, first: int = 0, seed: int = SEED) -> Iterator[Dict]:
+    """count articles numbered from first, oldest first, about 30 a day."""
+    rng = random.Random(seed + first)
+    start = date(2020, 1, 1)
+    for number in range(first, first + count):
+        yield synthetic_article(rng, number, start + timedelta(days=number // 30), source_words)
+
+
+def archive_dir(data_dir: str, count: int) -> str:
+    return os.path.join(data_dir, f"archive-{count}")
+
+
+def generate_archive(data_dir: str, count: int, source_words: int) -> str:
+    """Write database.csv and contents.json of count articles, unless already there."""
+    directory = archive_dir(data_dir, count)
+    marker = os.path.join(directory, "archive.json")
+    spec = {"count": count, "source_words": source_words, "seed": SEED}
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == spec:
+                return directory
+    except (IOError, ValueError):
+        pass
+    print(f"Generating a {count}-article archive in {directory}...")
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "database.csv"), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['date', 'URL', 'topic'])
+
+        def with_rows(articles):
+            for article in articles:
+                writer.writerow([article['date'], article['URL'], article['topic']])
+                yield article
+
+        write_records(os.path.join(directory, "contents.json"), with_rows(synthetic_articles(count, source_words)))
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return directory
+
+
+def page_html(rng: random.Random, number: int, source_words: int) -> str:
+    """An article page with the usual navigation, share and footer clutter around it."""
+    paragraphs = ''.join(f"<p>{_text(rng, 60)}.</p>" for _ in range(max(source_words // 60, 1)))
+    links = ''.join(f'<li><a href="/topic/{word}">{word}</a></li>' for word in rng.sample(WORDS, 12))
+    return (
+        f"<!DOCTYPE html><html><head><title>Story {number}</title>"
+        f"<script>var analytics = {{id: {number}}};</script><style>body {{ margin: 0 }}</style></head><body>"
+        f"<header><nav><ul>{links}</ul></nav></header>"
+        f'<div class="layout"><aside><ul>{links}</ul></aside><article><h1>Story {number}</h1>'
+        f"{paragraphs}<div class=\"share\">Share on social</div></article></div>"
+        f"<footer><p>All rights reserved</p><ul>{links}</ul></footer></body></html>"
+    )
+
+
+def generate_corpus(data_dir: str, pages: int, source_words: int) -> str:
+    """Write the saved-page corpus (pages/page-NNNNN.html), unless already there."""
+    directory = os.path.join(data_dir, "pages")
+    marker = os.path.join(directory, "corpus.json")
+    spec = {"pages": pages, "source_words": source_words, "seed": SEED}
+    try:
+        with open(marker, 'r', encoding='utf-8') as f:
+            if json.load(f) == spec:
+                return directory
+    except (IOError, ValueError):
+        pass
+    print(f"Generating {pages} article pages in {directory}...")
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    rng = random.Random(SEED)
+    for number in range(pages):
+        with open(os.path.join(directory, f"page-{number:05d}.html"), 'w', encoding='utf-8') as f:
+            f.write(page_html(rng, number, source_words))
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(spec, f)
+    return directory
+
+
+def corpus_pages(directory: str) -> List[str]:
+    return sorted(name for name in os.listdir(directory) if name.endswith('.html'))
+
+
+# Cases; each returns a list of result entries and runs in its own process
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    value = function(*args)
+    return value, time.perf_counter() - start
+
+
+def bench_merge(directory: str, count: int, scratch: str, source_words: int) -> List[Dict]:
+    from merge import merge_contents, merge_database
+    from metrics import metrics
+
+    metrics.configure("benchmark", record=True)
+    for name in ("database.csv", "contents.json"):
+        shutil.copyfile(os.path.join(directory, name), os.path.join(scratch, name))
+    database = os.path.join(scratch, "database.csv")
+    contents = os.path.join(scratch, "contents.json")
+
+    results = []
+    for phase, first in (("cold", count - DAILY_BATCH // 2), ("warm", count)):
+        # Half of each batch is already archived (or merged by the cold phase)
+        batch = list(synthetic_articles(DAILY_BATCH, source_words, first))
+        database_in = os.path.join(scratch, "database-today.csv")
+        contents_in = os.path.join(scratch, "contents-today.json")
+        with open(database_in, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['date', 'URL', 'topic'])
+            writer.writerows([article['date'], article['URL'], article['topic']] for article in batch)
+        write_records(contents_in, batch, indent=4)
+        scanned = metrics.total("rows_scanned")
+        start = time.perf_counter()
+        added = merge_database(database_in, database) + merge_contents(contents_in, contents)
+        results.append({
+            "case": f"merge-{phase}",
+            "seconds": time.perf_counter() - start,
+            # Archive rows read to (re)build the URL indexes; 0 once they are current
+            "rows_scanned": int(metrics.total("rows_scanned") - scanned),
+            "added": added,
+        })
+    return results
+
+
+def bench_render(directory: str, count: int, scratch: str, size: int = None) -> List[Dict]:
+    from json_to_html import iter_html, iter_json_file, load_json_file, select_articles, write_html_file
+
+    contents = os.path.join(directory, "contents.json")
+    output = os.path.join(scratch, "articles.html")
+    start = time.perf_counter()
+    articles = select_articles(iter_json_file(contents), size) if size else load_json_file(contents)
+    load_seconds = time.perf_counter() - start
+    write_html_file(iter_html(articles, size), output)
+    return [{
+        "case": "render-recent" if size else "render",
+        "seconds": time.perf_counter() - start,
+        "load_seconds": load_seconds,
+        "articles_rendered": len(articles),
+        "output_bytes": os.path.getsize(output),
+    }]
+
+
+def bench_extract(pages_dir: str) -> List[Dict]:
+    from extractors import BACKENDS, extract_text
+
+    pages = []
+    for name in corpus_pages(pages_dir):
+        with open(os.path.join(pages_dir, name), 'rb') as f:
+            pages.append(f.read())
+    results = []
+    for backend in BACKENDS:
+        try:
+            _, seconds = _timed(lambda: [extract_text(page, backend) for page in pages])
+        except RuntimeError as e:
+            print(f"Skipping extract with {backend}: {e}", file=sys.stderr)
+            continue
+        results.append({
+            "case": f"extract-{backend}",
+            "seconds": seconds,
+            "pages": len(pages),
+            "ms_per_page": seconds * 1000 / max(len(pages), 1),
+            "bytes": sum(len(page) for page in pages),
+        })
+    return results
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_collect(pages_dir: str, scratch: str) -> List[Dict]:
+    import news_collector
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=scratch))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        pages = corpus_pages(pages_dir)
+        for name in pages:
+            shutil.copyfile(os.path.join(pages_dir, name), os.path.join(scratch, name))
+        feeds = {}
+        for feed in range(FEEDS):
+            items = ''.join(f"<item><title>{name}</title><link>{base}/{name}</link></item>"
+                            for name in pages[feed::FEEDS])
+            with open(os.path.join(scratch, f"feed{feed}.xml"), 'w', encoding='utf-8') as f:
+                f.write(f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {feed}</title>'
+                        f'{items}</channel></rss>')
+            feeds[f"Feed {feed}"] = f"{base}/feed{feed}.xml"
+        database = os.path.join(scratch, "database.csv")
+        with open(database, 'w', encoding='utf-8') as f:
+            f.write("date,URL,topic\n")
+
+        news_collector.RSS_FEEDS = feeds
+        start = time.perf_counter()
+        _, articles = news_collector.collect_articles(
+            workers=FEEDS, feed_state_file=None, database_file=database, all_entries=True, max_entries=0,
+            cache_dir=None)
+        seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    return [{
+        "case": "collect",
+        "seconds": seconds,
+        "feeds": FEEDS,
+        "articles": len(articles),
+        "ms_per_article": seconds * 1000 / max(len(articles), 1),
+    }]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case: str, options: Dict) -> List[Dict]:
+    """Run one case in this (fresh) process with its output silenced."""
+    scratch = options["scratch"]
+    if os.path.isdir(scratch):
+        shutil.rmtree(scratch)
+    os.makedirs(scratch)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if case == "merge":
+                results = bench_merge(options["archive"], options["articles"], scratch, options["source_words"])
+            elif case == "render":
+                results = bench_render(options["archive"], options["articles"], scratch)
+            elif case == "render-recent":
+                results = bench_render(options["archive"], options["articles"], scratch, options["recent"])
+            elif case == "extract":
+                results = bench_extract(options["pages_dir"])
+            else:
+                results = bench_collect(options["pages_dir"], scratch)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    peak = peak_rss_mb()
+    for result in results:
+        if "articles" in options:
+            result["archive_articles"] = options["articles"]
+        result["peak_rss_mb"] = round(peak, 1)
+        result["seconds"] = round(result["seconds"], 4)
+    return results
+
+
+def run_isolated(case: str, options: Dict) -> List[Dict]:
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_case, (case, options))
+
+
+# Reporting
+
+def result_key(result: Dict) -> str:
+    return f"{result['case']}@{result.get('archive_articles', '-')}"
+
+
+def compare(results: List[Dict], baseline_file: str, tolerance: float) -> List[str]:
+    """Descriptions of the results slower than the baseline by more than tolerance."""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {result_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before and before["seconds"] > 0 and result["seconds"] > before["seconds"] * (1 + tolerance):
+            regressions.append(f"{result_key(result)}: {before['seconds']:.3f}s -> {result['seconds']:.3f}s "
+                               f"(+{(result['seconds'] / before['seconds'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark merge, render, extraction and collection on synthetic data",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark.py
+  python benchmark.py --sizes 1000,10000 --cases merge,render-recent
+  python benchmark.py --sizes 1000000 --cases merge,render-recent --output bench-1m.json
+  python benchmark.py --compare bench-baseline.json
+        """
+    )
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help=f'Comma-separated archive sizes (default: {",".join(map(str, DEFAULT_SIZES))})')
+    parser.add_argument('--cases', default=','.join(CASES), help=f'Comma-separated cases (default: {",".join(CASES)})')
+    parser.add_argument('--data-dir', default=DATA_DIR, help=f'Directory for generated data (default: {DATA_DIR})')
+    parser.add_argument('--pages', type=int, default=DEFAULT_PAGES,
+                        help=f'Pages in the extraction/collection corpus (default: {DEFAULT_PAGES})')
+    parser.add_argument('--source-words', type=int, default=DEFAULT_SOURCE_WORDS,
+                        help=f'Words of article text per synthetic article (default: {DEFAULT_SOURCE_WORDS})')
+    parser.add_argument('--recent', type=int, default=DEFAULT_RECENT,
+                        help=f'--size used by render-recent (default: {DEFAULT_RECENT})')
+    parser.add_argument('--output', '-o', default=RESULTS_FILE, help=f'Results file (default: {RESULTS_FILE})')
+    parser.add_argument('--compare', metavar='FILE', help='Earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Slowdown that counts as a regression with --compare (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(size) for size in args.sizes.split(',') if size]
+    except ValueError:
+        parser.error("--sizes must be comma-separated integers")
+    cases = [case for case in args.cases.split(',') if case]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (choose from {', '.join(CASES)})")
+    if args.compare and not os.path.exists(args.compare):
+        print(f"Error: File '{args.compare}' not found.")
+        sys.exit(1)
+
+    scratch = os.path.join(args.data_dir, "scratch")
+    runs = []
+    for case in cases:
+        if case in ARCHIVE_CASES:
+            for size in sizes:
+                runs.append((case, {"archive": generate_archive(args.data_dir, size, args.source_words),
+                                    "articles": size}))
+        else:
+            runs.append((case, {"pages_dir": generate_corpus(args.data_dir, args.pages, args.source_words)}))
+
+    results = []
+    for case, options in runs:
+        options.update(scratch=scratch, source_words=args.source_words, recent=args.recent)
+        label = f"{case} ({options['articles']} articles)" if "articles" in options else case
+        print(f"Running {label}...")
+        for result in run_isolated(case, options):
+            print(f"  {result['case']:<22} {result['seconds']:9.3f}s  peak {result['peak_rss_mb']:8.1f} MB")
+            results.append(result)
+
+    report = {
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for line in regressions:
+            print(f"  slower: {line}")
+        if regressions:
+            print(f"{len(regressions)} regressions beyond {args.tolerance:.0%} against {args.compare}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Date normalization shared by the collector, merge and the HTML renderer.
+The archive mixes 2025-08-12 (collector output), 25/08/12 (older
+database.csv rows) and occasional "2025-08-12 (Monday)" style dates. Each
+form is reduced once to a canonical ISO date (YYYY-MM-DD); merge.py stores
+it in contents records as date_iso, so sorting and rendering only compare
+strings.
+"""
+
+import argparse
+import os
+import re
+import sys
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, Optional
+
+ISO_DATE_FIELD = 'date_iso'
+
+# 2025-08-12, 2025/08/12, 2025.08.12, optionally followed by a time or weekday
+FOUR_DIGIT_YEAR = re.compile(r'\s*(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})(?!\d)')
+# 25/08/12 and the other two-digit-year orders
+TWO_DIGIT_YEAR = re.compile(r'\s*(\d{1,2})/(\d{1,2})/(\d{1,2})\s*$')
+
+
+def _iso(year: int, month: int, day: int) -> Optional[str]:
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def _full_year(year: int) -> int:
+    # Same pivot as strptime's %y
+    return year + (2000 if year < 69 else 1900)
+
+
+@lru_cache(maxsize=65536)
+def normalize_date(date_str: str) -> Optional[str]:
+    """
+    Canonical YYYY-MM-DD form of an archive date, or None if it cannot be parsed.
+    Two-digit-year dates are ambiguous; they are read as yy/mm/dd (the order
+    database.csv uses), then mm/dd/yy, then dd/mm/yy, taking the first order
+    that gives a valid date.
+    """
+    if not date_str:
+        return None
+    match = FOUR_DIGIT_YEAR.match(date_str)
+    if match:
+        year, month, day = (int(part) for part in match.groups())
+        return _iso(year, month, day)
+    match = TWO_DIGIT_YEAR.match(date_str)
+    if match:
+        first, second, third = (int(part) for part in match.groups())
+        for year, month, day in ((first, second, third), (third, first, second), (third, second, first)):
+            iso = _iso(_full_year(year), month, day)
+            if iso:
+                return iso
+    return None
+
+
+def record_date(record: Dict) -> Optional[str]:
+    """ISO date of a record: its stored date_iso, else its parsed date field."""
+    return record.get(ISO_DATE_FIELD) or normalize_date(record.get('date', ''))
+
+
+def with_iso_date(record: Dict) -> Dict:
+    """Add the date_iso field to a record that lacks it and has a parsable date."""
+    if ISO_DATE_FIELD not in record:
+        iso = normalize_date(record.get('date', ''))
+        if iso:
+            record[ISO_DATE_FIELD] = iso
+    return record
+
+
+def today_iso() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+def iter_with_iso_dates(records: Iterable[Dict]) -> Iterator[Dict]:
+    for record in records:
+        yield with_iso_date(record)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Normalize archive dates to ISO form",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python dates.py check --contents contents.json --database database.csv
+  python dates.py migrate --contents contents.json --database database.csv
+  python dates.py migrate --store articles.db
+        """
+    )
+    parser.add_argument('command', choices=['check', 'migrate'], help='Action to perform')
+    parser.add_argument('--contents', help='Contents .json/.jsonl file: add date_iso to every record')
+    parser.add_argument('--database', help='Database CSV file: rewrite the date column in ISO form')
+    parser.add_argument('--store', help='SQLite article store: recompute its date index')
+    args = parser.parse_args()
+
+    if not (args.contents or args.database or args.store):
+        print("Error: --contents, --database and/or --store is required.")
+        sys.exit(1)
+    for path in (args.contents, args.database, args.store):
+        if path and not os.path.exists(path):
+            print(f"Error: File '{path}' not found.")
+            sys.exit(1)
+
+    # Imported here so merge.py and article_store.py can import this module without a cycle
+    from article_store import ArticleStore
+    from json_records import iter_records, write_records
+    from merge import iter_csv_data, recover_append, save_csv_data
+
+    if args.command == 'check':
+        for path, records in ((args.contents, args.contents and iter_records(args.contents)),
+                              (args.database, args.database and iter_csv_data(args.database))):
+            if not path:
+                continue
+            total = unparsable = 0
+            for record in records:
+                total += 1
+                if not record_date(record):
+                    unparsable += 1
+                    print(f"  unparsable date {record.get('date', '')!r}: {record.get('URL', '')}")
+            print(f"{path}: {total} records, {unparsable} without a parsable date")
+        return
+
+    if args.contents:
+        recover_append(args.contents)
+        count = write_records(args.contents, iter_with_iso_dates(iter_records(args.contents)))
+        print(f"Added date_iso to {count} records in {args.contents}")
+    if args.database:
+        recover_append(args.database)
+        rows = list(iter_csv_data(args.database))
+        changed = 0
+        for row in rows:
+            iso = normalize_date(row.get('date', ''))
+            if iso and iso != row.get('date'):
+                row['date'] = iso
+                changed += 1
+        if changed:
+            save_csv_data(args.database, rows)
+        print(f"Rewrote {changed} dates in {args.database}")
+    if args.store:
+        store = ArticleStore(args.store)
+        try:
+            changed = store.refresh_dates()
+        finally:
+            store.close()
+        print(f"Updated {changed} dates in {args.store}")
+
+
+if __name__ == "__main__":
+    main()
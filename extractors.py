@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Article text extraction backends.
+The faster backends only build the parts of the tree that get_main_content()
+can actually pick. The strainer backend gives the same text as a full
+html.parser tree; lxml may differ on malformed markup, which is what the
+corpus comparison below is for.
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+CONTENT_DIV_CLASSES = ["post-content", "article-content", "entry-content", "post-body", "article-body"]
+DEFAULT_BACKEND = "strainer"
+BACKENDS = ("html.parser", "strainer", "lxml")
+
+
+def get_main_content(soup):
+    """Extract main article text from a BeautifulSoup object."""
+    # Try common article tags
+    main_content = soup.find("article")
+    if not main_content:
+        main_content = soup.find("main")
+
+    # Fallback to common content div classes
+    if not main_content:
+        content_divs = soup.find_all("div", class_=CONTENT_DIV_CLASSES)
+        if content_divs:
+            main_content = content_divs[0]
+
+    # Generic fallback: get all text from body, but try to remove nav/footer
+    if not main_content:
+        main_content = soup.body
+        if main_content:
+            for tag in main_content.find_all(['nav', 'footer', 'header', 'script', 'style']):
+                tag.decompose()
+
+    if main_content:
+        return main_content.get_text(separator='\n', strip=True)
+    return ""
+
+
+def _has_content_class(value):
+    """Match a class attribute that includes one of CONTENT_DIV_CLASSES, whether raw or already split."""
+    if not value:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return any(name in CONTENT_DIV_CLASSES for name in classes)
+
+
+def _strained_content(content, parser):
+    """
+    Parse only the candidate subtrees, in get_main_content() priority order.
+    Falls back to a full parse when the page has none of them.
+    """
+    soup = BeautifulSoup(content, parser, parse_only=SoupStrainer(["article", "main"]))
+    if soup.find(["article", "main"]):
+        return get_main_content(soup)
+
+    soup = BeautifulSoup(content, parser, parse_only=SoupStrainer("div", attrs={"class": _has_content_class}))
+    first_div = soup.find("div")
+    if first_div:
+        return first_div.get_text(separator='\n', strip=True)
+
+    return get_main_content(BeautifulSoup(content, parser))
+
+
+def extract_text(content, backend=DEFAULT_BACKEND):
+    """
+    Extract the main article text from raw HTML with the given backend:
+      html.parser - full tree with the pure-Python parser (reference output)
+      strainer    - html.parser, but only article/main/content divs are built
+      lxml        - the strainer approach on top of the lxml parser
+    """
+    if backend == "html.parser":
+        return get_main_content(BeautifulSoup(content, 'html.parser'))
+    if backend == "strainer":
+        return _strained_content(content, 'html.parser')
+    if backend == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            raise RuntimeError("The lxml backend requires the lxml package (uv sync --extra lxml)")
+        return _strained_content(content, 'lxml')
+    raise ValueError(f"Unknown extractor backend: {backend}")
+
+
+def page_filename(url):
+    """File name used for a URL's page in a saved-HTML directory."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest() + '.html'
+
+
+def read_page(path):
+    """Read a saved page, transparently decompressing .gz files."""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def compare_backends(paths, backends=BACKENDS):
+    """
+    Run every backend over the pages and compare against the reference.
+    A sibling .txt file (page.html -> page.txt) is used as the golden text
+    when present, otherwise the html.parser output is.
+    Returns {backend: {"seconds": float, "mismatches": [path, ...]}}.
+    """
+    results = {backend: {"seconds": 0.0, "mismatches": []} for backend in backends}
+    for path in paths:
+        content = read_page(path)
+        golden_path = path[:-3] if path.endswith('.gz') else path
+        golden_path = os.path.splitext(golden_path)[0] + '.txt'
+        if os.path.exists(golden_path):
+            with open(golden_path, 'r', encoding='utf-8') as f:
+                expected = f.read()
+        else:
+            expected = extract_text(content, "html.parser")
+        for backend in backends:
+            start = time.perf_counter()
+            text = extract_text(content, backend)
+            results[backend]["seconds"] += time.perf_counter() - start
+            if text != expected:
+                results[backend]["mismatches"].append(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare extractor backends on a corpus of saved HTML pages",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python extractors.py pages/
+  python extractors.py pages/ --backend strainer --backend lxml
+        """
+    )
+    parser.add_argument('corpus', help='Directory of saved .html / .html.gz pages')
+    parser.add_argument(
+        '--backend', '-b',
+        action='append',
+        choices=BACKENDS,
+        help='Backend to compare (repeatable; default: all)'
+    )
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, '*.html')) + glob.glob(os.path.join(args.corpus, '*.html.gz')))
+    if not paths:
+        print(f"Error: No .html pages found in '{args.corpus}'.")
+        sys.exit(1)
+
+    print(f"Comparing extractors on {len(paths)} pages...")
+    results = compare_backends(paths, args.backend or BACKENDS)
+    failed = False
+    for backend, result in results.items():
+        per_page = result["seconds"] / len(paths) * 1000
+        mismatches = len(result["mismatches"])
+        print(f"  - {backend}: {per_page:.2f} ms/page, {mismatches} mismatches")
+        for path in result["mismatches"]:
+            print(f"      {path}")
+        failed = failed or mismatches > 0
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
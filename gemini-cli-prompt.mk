@@ -24,7 +24,7 @@ all:
 		   echo "FILE is set, reading from file: $(FILE)"; \
 		   if [ ! -f gemini.key ]; then \
 			   echo "gemini.key 파일이 없습니다. vi로 파일을 만드세요."; \
-			   exit; \
+			   exit 1; \
 		   fi; \
 		   if [ -f "$(FILE)" ]; then \
 			echo "File exists, reading content and executing directly..."; \
@@ -41,9 +41,11 @@ all:
 				echo "  - Network connectivity issues"; \
 				echo "  - Invalid API key"; \
 				echo "  - Service temporarily unavailable"; \
+				exit 1; \
 			fi; \
 		else \
 			echo "Error: File $(FILE) not found!"; \
+			exit 2; \
 		fi; \
 	else \
 		   if [ ! -f gemini.key ]; then \
@@ -63,6 +65,7 @@ all:
 			echo "  - Network connectivity issues"; \
 			echo "  - Invalid API key"; \
 			echo "  - Service temporarily unavailable"; \
+			exit 1; \
 		fi; \
 	fi
 
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Streaming readers and writers for article record files.
+Two storage formats are supported, chosen by file extension:
+  .json  - one JSON array (the original contents.json format)
+  .jsonl - JSON Lines, one article per line
+Both are read incrementally so memory does not grow with the archive.
+"""
+
+import argparse
+import json
+import os
+import sys
+import textwrap
+from typing import Dict, Iterable, Iterator
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = ' \t\r\n'
+
+
+def is_jsonl(file_path: str) -> bool:
+    return file_path.endswith('.jsonl')
+
+
+def _iter_json_array(f, chunk_size: int = CHUNK_SIZE) -> Iterator:
+    """Yield the items of a JSON array one at a time from a text stream."""
+    decoder = json.JSONDecoder()
+    buffer = f.read(chunk_size)
+    while buffer and not buffer.strip(WHITESPACE):
+        buffer = f.read(chunk_size)
+    eof = not buffer
+    position = len(buffer) - len(buffer.lstrip(WHITESPACE))
+    if position >= len(buffer) or buffer[position] != '[':
+        raise ValueError("JSON data should be a list of articles")
+    position += 1
+    # After an item only ',' or ']' may follow; after a ',' only an item
+    after_item = after_comma = False
+
+    while True:
+        # Skip whitespace, refilling the buffer as needed
+        while True:
+            while position < len(buffer) and buffer[position] in WHITESPACE:
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            buffer = f.read(chunk_size)
+            position = 0
+            eof = not buffer
+
+        if position >= len(buffer):
+            raise ValueError("Unexpected end of JSON array")
+        char = buffer[position]
+        if char == ']' and not after_comma:
+            return
+        if after_item:
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' after a JSON array item, found {char!r}")
+            position += 1
+            after_item, after_comma = False, True
+            continue
+        if char in ',]':
+            raise ValueError(f"Expected a JSON array item, found {char!r}")
+
+        error = None
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            item, end, error = None, None, e
+        # A scalar cut by the end of the buffer (2 of 2.5) still decodes, so it
+        # only counts once the separator after it has been read too
+        if end is not None and not isinstance(item, (dict, list)) and not eof:
+            following = end
+            while following < len(buffer) and buffer[following] in WHITESPACE:
+                following += 1
+            if following == len(buffer) or buffer[following] not in ',]':
+                end = None
+        if end is None:
+            more = f.read(chunk_size)
+            if not more:
+                if error is not None:
+                    raise error
+                eof = True
+                continue
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+        yield item
+        position = end
+        after_item, after_comma = True, False
+        if position > chunk_size:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_records(file_path: str) -> Iterator[Dict]:
+    """Yield the records of a .json array or .jsonl file one at a time."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if is_jsonl(file_path):
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number} of {file_path}: {e}")
+        else:
+            yield from _iter_json_array(f)
+
+
+def format_jsonl(record: Dict) -> str:
+    """One record as a JSON Lines line, including the newline."""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def format_array_item(record: Dict, indent: int = 2) -> str:
+    """One record formatted the way json.dump(list, indent=indent) lays out its items."""
+    return textwrap.indent(json.dumps(record, ensure_ascii=False, indent=indent), ' ' * indent)
+
+
+def write_records(file_path: str, records: Iterable[Dict], indent: int = 2) -> int:
+    """
+    Stream records to a .json array or .jsonl file through a temp file and an
+    atomic rename. Array output is identical to json.dump(list, indent=indent).
+    Returns the number of records written.
+    """
+    count = 0
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        if is_jsonl(file_path):
+            for record in records:
+                f.write(format_jsonl(record))
+                count += 1
+        else:
+            f.write("[")
+            for record in records:
+                f.write(",\n" if count else "\n")
+                f.write(format_array_item(record, indent))
+                count += 1
+            f.write("\n]" if count else "]")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+    return count
+
+
+def convert(input_file: str, output_file: str) -> int:
+    """Convert between the array and JSON Lines formats without loading the whole file."""
+    return write_records(output_file, iter_records(input_file))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert article files between JSON array and JSON Lines formats",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python json_records.py contents.json contents.jsonl
+  python json_records.py contents.jsonl contents.json
+        """
+    )
+    parser.add_argument('input', help='Input .json or .jsonl file')
+    parser.add_argument('output', help='Output .json or .jsonl file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: File '{args.input}' not found.")
+        sys.exit(1)
+
+    try:
+        count = convert(args.input, args.output)
+    except ValueError as e:
+        print(f"Error: Invalid JSON in file '{args.input}': {e}")
+        sys.exit(1)
+    print(f"Converted {count} articles: {args.input} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
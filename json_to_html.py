@@ -3,23 +3,45 @@ JSON to HTML Converter
 Converts a JSON file containing articles to a standalone HTML page.
 """
 
-import json
 import argparse
+import hashlib
+import heapq
+import json
+import os
 import sys
 from datetime import datetime
 from html import escape
 
+from article_store import ArticleStore
+from dates import record_date
+from json_records import iter_records
+from metrics import add_arguments as add_metrics_arguments, configure_from_args as configure_metrics, metrics
+from profiling import add_arguments as add_profile_arguments, install_from_args as install_profiling
+from search import SearchIndex
+
+class RenderError(Exception):
+    """An input could not be read or the output could not be written; main() reports it."""
+
 def load_json_file(input_file):
-    """Load JSON data from file."""
+    """Load JSON data (a .json array or .jsonl file) from file."""
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with metrics.timer("load", {"file": os.path.basename(input_file)}) as event:
+            articles = list(iter_records(input_file))
+            event["rows"] = len(articles)
+        return articles
     except FileNotFoundError:
-        print(f"Error: File '{input_file}' not found.")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in file '{input_file}': {e}")
-        sys.exit(1)
+        raise RenderError(f"File '{input_file}' not found.") from None
+    except ValueError as e:
+        raise RenderError(f"Invalid JSON in file '{input_file}': {e}") from e
+
+def iter_json_file(input_file):
+    """Yield articles from a .json array or .jsonl file one at a time."""
+    try:
+        yield from iter_records(input_file)
+    except FileNotFoundError:
+        raise RenderError(f"File '{input_file}' not found.") from None
+    except ValueError as e:
+        raise RenderError(f"Invalid JSON in file '{input_file}': {e}") from e
 
 def get_css_styles():
     """Return CSS styles as a string."""
@@ -233,61 +255,89 @@ def get_css_styles():
         }
     """
 
-def generate_html(articles_data, size=None):
-    """Generate HTML content from articles data."""
-    
-    def parse_date_for_sorting(date_str):
-        """Parse date string for sorting purposes."""
-        if not date_str or date_str == 'No Date':
-            return datetime.min
-        
-        # Try different date formats
-        formats = [
-            '%Y-%m-%d',     # 2025-08-12
-            '%Y/%m/%d',     # 2025/08/12
-            '%y/%m/%d',     # 25/08/12
-            '%m/%d/%y',     # 08/12/25
-            '%d/%m/%y',     # 12/08/25
-        ]
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt)
-            except ValueError:
-                continue
+PAGER_STYLES = """
+        .pager {
+            display: flex;
+            justify-content: space-between;
+            margin: 20px 0;
+        }
         
-        # If no format matches, try to extract just the date part
-        try:
-            # Handle cases like "2025-08-12 (Monday)"
-            date_part = date_str.split()[0]
-            return datetime.strptime(date_part, '%Y-%m-%d')
-        except:
-            return datetime.min
-    
-    # Sort articles by date (newest first)
-    articles = sorted(articles_data, key=lambda x: parse_date_for_sorting(x.get('date', '')), reverse=True)
-    
-    # Limit articles if size is specified
+        .pager a {
+            color: #667eea;
+            text-decoration: none;
+            font-weight: 600;
+        }
+        
+        .shard-list li {
+            margin-bottom: 10px;
+        }
+        
+        .shard-list a {
+            color: #2c3e50;
+            font-weight: 600;
+        }
+    """
+
+INDEX_FILE = "index.html"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_PAGE_SIZE = 50
+DEFAULT_SEARCH_LIMIT = 20
+# Wrapped with --profile; iter_html does the work of generate_html and the page writers
+PROFILE_TARGETS = ("load_json_file", "select_articles", "iter_html", "write_sharded_html", "search_articles")
+
+def date_sort_key(article):
+    """
+    Sort key for newest-first ordering: the article's ISO date, which merge.py
+    stores as date_iso (older records are parsed once, cached); undated
+    articles sort last.
+    """
+    return record_date(article) or ''
+
+def format_article_date(iso_date):
+    """Display form of an ISO date, e.g. 2025년 08월 12일."""
+    return f"{iso_date[:4]}년 {iso_date[5:7]}월 {iso_date[8:10]}일"
+
+def select_articles(articles_data, size=None):
+    """
+    Return the articles to render, newest first.
+    With a size only the newest `size` articles are kept, using a bounded heap
+    instead of sorting the whole archive; ties keep their input order exactly
+    like the full sort does.
+    """
     if size is not None and size > 0:
-        articles = articles[:size]
+        return heapq.nlargest(size, articles_data, key=date_sort_key)
+    return sorted(articles_data, key=date_sort_key, reverse=True)
+
+def iter_html(articles_data, size=None, subtitle="최신 기술 트렌드와 뉴스", nav=None, ranked=False):
+    """
+    Generate HTML content from articles data, yielding it in chunks.
+    nav is an optional pager (see pager_html) placed under the header and above
+    the footer; without it the output is the single-page layout. ranked
+    articles (search results) are rendered in the given order.
+    """
+    
+    # Sort articles by date (newest first), limited to size if specified
+    articles = list(articles_data) if ranked else select_articles(articles_data, size)
     
-    html_content = f"""<!DOCTYPE html>
+    yield f"""<!DOCTYPE html>
 <html lang="ko">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>기술 뉴스 모음</title>
     <style>
-{get_css_styles()}
+{get_css_styles()}{PAGER_STYLES if nav else ""}
     </style>
 </head>
 <body>
     <div class="header">
         <h1>기술 뉴스 모음</h1>
-        <div class="subtitle">최신 기술 트렌드와 뉴스</div>
+        <div class="subtitle">{escape(subtitle)}</div>
         <div class="article-count">총 {len(articles)}개 기사</div>
     </div>
 """
+    if nav:
+        yield nav
 
     for article in articles:
         # Escape HTML characters in the content
@@ -299,43 +349,10 @@ def generate_html(articles_data, size=None):
         questions = article.get('questions', [])
         
         # Format date for better display
-        try:
-            if date and date != 'No Date':
-                # Try to parse different date formats
-                formats = [
-                    '%Y-%m-%d',     # 2025-08-12
-                    '%Y/%m/%d',     # 2025/08/12
-                    '%y/%m/%d',     # 25/08/12
-                    '%m/%d/%y',     # 08/12/25
-                    '%d/%m/%y',     # 12/08/25
-                ]
-                
-                parsed_date = None
-                for fmt in formats:
-                    try:
-                        parsed_date = datetime.strptime(date, fmt)
-                        break
-                    except ValueError:
-                        continue
-                
-                # Handle cases like "2025-08-12 (Monday)"
-                if not parsed_date:
-                    try:
-                        date_part = date.split()[0]
-                        parsed_date = datetime.strptime(date_part, '%Y-%m-%d')
-                    except:
-                        pass
-                
-                if parsed_date:
-                    formatted_date = parsed_date.strftime('%Y년 %m월 %d일')
-                else:
-                    formatted_date = date
-            else:
-                formatted_date = date
-        except:
-            formatted_date = date
-        
-        html_content += f"""
+        iso_date = record_date(article)
+        formatted_date = format_article_date(iso_date) if iso_date else date
+        
+        yield f"""
     <article class="article">
         <div class="article-header">
             <div class="article-date">{formatted_date}</div>
@@ -358,18 +375,21 @@ def generate_html(articles_data, size=None):
         
         for question in questions:
             escaped_question = escape(str(question))
-            html_content += f"""
+            yield f"""
                     <li>{escaped_question}</li>"""
         
-        html_content += """
+        yield """
                 </ol>
             </div>
         </div>
     </article>"""
 
+    if nav:
+        yield nav
+
     # Add footer
     current_time = datetime.now().strftime('%Y년 %m월 %d일 %H:%M')
-    html_content += f"""
+    yield f"""
     
     <div class="footer">
         <p>이 문서는 {current_time}에 생성되었습니다.</p>
@@ -379,17 +399,176 @@ def generate_html(articles_data, size=None):
 </body>
 </html>"""
 
-    return html_content
+def generate_html(articles_data, size=None):
+    """Generate HTML content from articles data."""
+    return "".join(iter_html(articles_data, size))
 
-def save_html_file(html_content, output_file):
-    """Save HTML content to file."""
+def write_html_file(html_chunks, output_file):
+    """
+    Stream HTML chunks to the output file. The page is written to a temp
+    file first, so a failure mid-render leaves the previous page in place.
+    """
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        print(f"HTML file successfully created: {output_file}")
+        with metrics.timer("render", {"output": os.path.basename(output_file)}) as event:
+            write_file_atomically(html_chunks, output_file)
+            event["bytes"] = os.path.getsize(output_file)
+    except RenderError:
+        raise
     except Exception as e:
-        print(f"Error saving HTML file: {e}")
-        sys.exit(1)
+        raise RenderError(f"Could not save HTML file {output_file}: {e}") from e
+    print(f"HTML file successfully created: {output_file}")
+
+def shard_articles(articles_data, page_size=DEFAULT_PAGE_SIZE, by_month=False):
+    """
+    Split the archive into shards, oldest shard first, as a list of
+    (filename, label, articles) with each shard's articles newest first.
+    Fixed-size pages are counted from the oldest article, so new articles only
+    change the last page; monthly shards are named by month (undated.html
+    collects articles without a parsable date).
+    """
+    chronological = select_articles(articles_data)[::-1]
+    shards = []
+    if by_month:
+        months = {}
+        for article in chronological:
+            iso_date = record_date(article)
+            months.setdefault(iso_date[:7] if iso_date else None, []).append(article)
+        if None in months:
+            shards.append(("undated.html", "날짜 없음", months.pop(None)[::-1]))
+        for month in sorted(months):
+            year, month_number = month.split('-')
+            shards.append((f"{month}.html", f"{year}년 {month_number}월", months[month][::-1]))
+        return shards
+
+    for start in range(0, len(chronological), page_size):
+        page = chronological[start:start + page_size]
+        first, last = page[0].get('date', ''), page[-1].get('date', '')
+        label = first if first == last else f"{first} ~ {last}"
+        shards.append((f"page-{len(shards) + 1:04d}.html", label, page[::-1]))
+    return shards
+
+def pager_html(newer=None, older=None, index_file=INDEX_FILE):
+    """Navigation links between neighbouring shards and the index page."""
+    newer_link = f'<a href="{escape(newer)}">← 최신 기사</a>' if newer else '<span></span>'
+    older_link = f'<a href="{escape(older)}">이전 기사 →</a>' if older else '<span></span>'
+    return f"""
+    <div class="pager">
+        {newer_link}
+        <a href="{escape(index_file)}">전체 목록</a>
+        {older_link}
+    </div>
+"""
+
+def iter_index_html(shards):
+    """Generate the index page listing the shards (filename, label, count), newest first."""
+    total = sum(count for _, _, count in shards)
+    yield f"""<!DOCTYPE html>
+<html lang="ko">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>기술 뉴스 모음</title>
+    <style>
+{get_css_styles()}{PAGER_STYLES}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>기술 뉴스 모음</h1>
+        <div class="subtitle">전체 목록</div>
+        <div class="article-count">총 {total}개 기사</div>
+    </div>
+
+    <article class="article">
+        <div class="article-content">
+            <ul class="shard-list">"""
+    for filename, label, count in shards:
+        yield f"""
+                <li><a href="{escape(filename)}">{escape(label)}</a> ({count}개 기사)</li>"""
+    yield """
+            </ul>
+        </div>
+    </article>
+</body>
+</html>"""
+
+def shard_hash(*parts):
+    """Content hash of everything a shard page is rendered from."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_manifest(manifest_path):
+    """Load the shard manifest, or an empty one if it is missing or unreadable."""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+def write_file_atomically(html_chunks, output_file):
+    """Stream HTML chunks to a temp file and rename it over output_file."""
+    temp_path = output_file + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for chunk in html_chunks:
+                f.write(chunk)
+        os.replace(temp_path, output_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def write_sharded_html(articles_data, output_dir, page_size=DEFAULT_PAGE_SIZE, by_month=False):
+    """
+    Write the archive as shard pages plus index.html into output_dir.
+    manifest.json records a content hash per page; pages whose hash is
+    unchanged are left alone and pages that no longer exist are removed.
+    Returns (written, total) page counts.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    layout = "month" if by_month else f"pages:{page_size}"
+    manifest = load_manifest(manifest_path)
+    previous = manifest.get("pages", {}) if manifest.get("layout") == layout else {}
+
+    shards = shard_articles(articles_data, page_size, by_month)
+    pages = {}
+    written = 0
+
+    def render(filename, digest, html_chunks):
+        nonlocal written
+        pages[filename] = digest
+        path = os.path.join(output_dir, filename)
+        if previous.get(filename) == digest and os.path.exists(path):
+            return
+        write_file_atomically(html_chunks, path)
+        written += 1
+
+    for position, (filename, label, articles) in enumerate(shards):
+        newer = shards[position + 1][0] if position + 1 < len(shards) else None
+        older = shards[position - 1][0] if position > 0 else None
+        nav = pager_html(newer, older)
+        render(filename, shard_hash(label, nav, articles), iter_html(articles, subtitle=label, nav=nav))
+
+    listing = [(filename, label, len(articles)) for filename, label, articles in reversed(shards)]
+    render(INDEX_FILE, shard_hash(listing), iter_index_html(listing))
+
+    for filename in set(manifest.get("pages", {})) - set(pages):
+        stale_path = os.path.join(output_dir, filename)
+        if os.path.exists(stale_path):
+            os.remove(stale_path)
+
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({"layout": layout, "pages": pages}, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+    return written, len(pages)
+
+def search_articles(input_file, query, limit):
+    """Full articles for the best search hits of a query, best first (see search.py)."""
+    index = SearchIndex.open(input_file)
+    ranks = {hit['URL']: rank for rank, (_, hit) in enumerate(index.search(query, limit))}
+    found = [article for article in iter_json_file(input_file) if article.get('URL') in ranks]
+    return sorted(found, key=lambda article: ranks[article['URL']])
 
 def main():
     parser = argparse.ArgumentParser(
@@ -401,48 +580,145 @@ Examples:
   python json_to_html.py -i data.json -o output.html
   python json_to_html.py --input contents.json --output recent.html --size 5
   python json_to_html.py -i contents.json -o latest.html -s 3
+  python json_to_html.py --store articles.db -o recent.html -s 10
+  python json_to_html.py --input contents.json --pages-dir output/pages
+  python json_to_html.py --input contents.json --pages-dir output/months --by-month
+  python json_to_html.py --input contents.json --output search.html --query "apple ai"
+  python json_to_html.py -i contents.json -o recent.html -s 10 --profile profiles
         """
     )
     
     parser.add_argument(
         '--input', '-i',
-        required=True,
-        help='Input JSON file path'
+        help='Input JSON file path (.json array or .jsonl)'
+    )
+    
+    parser.add_argument(
+        '--store',
+        help='Read articles from this SQLite article store instead of --input'
     )
     
     parser.add_argument(
         '--output', '-o',
-        required=True,
         help='Output HTML file path'
     )
     
+    parser.add_argument(
+        '--query', '-q',
+        help='Render the search results for this query instead (uses the search index of --input)'
+    )
+    
+    parser.add_argument(
+        '--pages-dir',
+        help='Write the whole archive as paginated pages plus index.html into this directory'
+    )
+    
+    parser.add_argument(
+        '--page-size',
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help=f'Articles per page with --pages-dir (default: {DEFAULT_PAGE_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--by-month',
+        action='store_true',
+        help='With --pages-dir, write one page per month instead of fixed-size pages'
+    )
+    
     parser.add_argument(
         '--size', '-s',
         type=int,
         help='Number of recent articles to include (default: all articles)'
     )
     
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    configure_metrics("render", args)
+    install_profiling("render", args, (sys.modules[__name__], PROFILE_TARGETS))
     
-    # Load JSON data
-    print(f"Loading JSON data from: {args.input}")
-    articles_data = load_json_file(args.input)
+    if not args.input and not args.store:
+        parser.error("one of --input or --store is required")
+    if not args.output and not args.pages_dir:
+        parser.error("one of --output or --pages-dir is required")
+    if args.pages_dir and args.page_size < 1:
+        parser.error("--page-size must be at least 1")
+    if args.pages_dir and args.size:
+        parser.error("--size cannot be used with --pages-dir, which writes the whole archive")
+    if args.query and (not args.input or not args.output):
+        parser.error("--query requires --input and --output")
     
-    if not isinstance(articles_data, list):
-        print("Error: JSON data should be a list of articles.")
+    try:
+        convert(args)
+    except RenderError as e:
+        print(f"Error: {e}")
         sys.exit(1)
+
+def convert(args):
+    """Render the pages main() was asked for."""
+    if args.query:
+        print(f"Searching {args.input} for: {args.query}")
+        articles_data = search_articles(args.input, args.query, args.size or DEFAULT_SEARCH_LIMIT)
+        print(f"Found {len(articles_data)} matching articles")
+        print(f"Saving HTML to: {args.output}")
+        write_html_file(iter_html(articles_data, subtitle=f'"{args.query}" 검색 결과', ranked=True), args.output)
+        return
+    
+    if args.pages_dir:
+        if args.store:
+            print(f"Loading articles from store: {args.store}")
+            store = ArticleStore(args.store)
+            try:
+                articles_data = list(store.iter_contents())
+            finally:
+                store.close()
+        else:
+            print(f"Loading JSON data from: {args.input}")
+            articles_data = load_json_file(args.input)
+        print(f"Found {len(articles_data)} articles")
+        print(f"Writing pages to: {args.pages_dir}")
+        with metrics.timer("render", {"output": "pages"}, articles=len(articles_data)) as event:
+            written, total = write_sharded_html(articles_data, args.pages_dir, args.page_size, args.by_month)
+            event.update(pages_written=written, pages=total)
+        print(f"Pages written: {written} of {total} ({total - written} unchanged)")
+        return
+    
+    if args.store:
+        # The store returns the newest articles already in render order
+        print(f"Loading articles from store: {args.store}")
+        store = ArticleStore(args.store)
+        try:
+            with metrics.timer("load", {"file": os.path.basename(args.store)}, size=args.size) as event:
+                total_articles = store.count_contents()
+                articles_data = store.latest_contents(args.size)
+                event["rows"] = len(articles_data)
+        finally:
+            store.close()
+    elif args.size:
+        # Stream the file through a bounded heap so only the newest articles stay in memory
+        print(f"Loading JSON data from: {args.input}")
+        counter = {"total": 0}
+        def counted(records):
+            for record in records:
+                counter["total"] += 1
+                yield record
+        with metrics.timer("load", {"file": os.path.basename(args.input)}, size=args.size) as event:
+            articles_data = select_articles(counted(iter_json_file(args.input)), args.size)
+            event["rows"] = total_articles = counter["total"]
+    else:
+        # Load JSON data
+        print(f"Loading JSON data from: {args.input}")
+        articles_data = load_json_file(args.input)
+        total_articles = len(articles_data)
     
-    total_articles = len(articles_data)
     size_info = f" (showing {args.size} most recent)" if args.size else ""
     print(f"Found {total_articles} articles{size_info}")
     
-    # Generate HTML
+    # Generate and save HTML, streaming chunks to the file
     print("Generating HTML content...")
-    html_content = generate_html(articles_data, args.size)
-    
-    # Save HTML file
     print(f"Saving HTML to: {args.output}")
-    save_html_file(html_content, args.output)
+    write_html_file(iter_html(articles_data, args.size), args.output)
 
 if __name__ == "__main__":
     print("Starting JSON to HTML conversion...")
@@ -6,137 +6,465 @@ Merges daily data files into main database and contents files.
 
 import argparse
 import csv
+import io
 import json
 import os
+import itertools
 import sys
-from typing import List, Dict, Set
+import time
+from typing import Iterable, List, Dict, Optional, Tuple
+
+from article_store import ArticleStore
+from dates import iter_with_iso_dates, normalize_date
+from json_records import format_array_item, format_jsonl, is_jsonl, iter_records, write_records
+from metrics import add_arguments as add_metrics_arguments, configure_from_args as configure_metrics, metrics
+from near_dup import MODES as NEAR_DUP_MODES, NearDupIndex, filter_near_duplicates, open_near_dup_index
+from profiling import add_arguments as add_profile_arguments, install_from_args as install_profiling
+from search import open_search_index
+from url_index import UrlIndex, normalize_url
+
+TAIL_SCAN_BYTES = 4096
+# Loading and duplicate checks, wrapped with --profile
+PROFILE_TARGETS = ("load_csv_data", "load_json_data", "open_url_index", "select_new_entries",
+                   "select_unknown_entries", "open_near_dup_index", "filter_near_duplicates")
 
 
 def load_csv_data(file_path: str) -> List[Dict[str, str]]:
     """Load CSV data and return as list of dictionaries."""
     data = []
     if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                data = list(reader)
-        except Exception as e:
-            print(f"Warning: Could not read {file_path}: {e}")
+        with metrics.timer("load", {"file": os.path.basename(file_path)}) as event:
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    data = list(reader)
+            except Exception as e:
+                print(f"Warning: Could not read {file_path}: {e}")
+                metrics.error("load", str(e), file=file_path)
+            event["rows"] = len(data)
     return data
 
 
+def atomic_write(file_path: str, content: str) -> None:
+    """Write a whole file through a fsync'd temp file and an atomic rename."""
+    temp_path = file_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
+def journal_path(file_path: str) -> str:
+    return file_path + '.journal'
+
+
+def append_at(file_path: str, offset: int, payload: str) -> None:
+    """
+    Crash-safe in-place append: truncate file_path at offset and write payload.
+    The operation is first recorded in a fsync'd journal, so an interrupted
+    append is replayed by recover_append() instead of leaving a torn file.
+    """
+    with open(journal_path(file_path), 'w', encoding='utf-8') as f:
+        json.dump({"offset": offset, "payload": payload}, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    _apply_append(file_path, offset, payload)
+    os.remove(journal_path(file_path))
+
+
+def _apply_append(file_path: str, offset: int, payload: str) -> None:
+    with open(file_path, 'r+b') as f:
+        f.seek(offset)
+        f.truncate()
+        f.write(payload.encode('utf-8'))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def recover_append(file_path: str) -> None:
+    """Finish an append that was interrupted by a crash, if any."""
+    path = journal_path(file_path)
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            pending = json.load(f)
+    except ValueError:
+        # The journal itself was torn, so the data file was never touched
+        os.remove(path)
+        return
+    print(f"Recovering interrupted append to {file_path}")
+    _apply_append(file_path, pending["offset"], pending["payload"])
+    os.remove(path)
+
+
 def save_csv_data(file_path: str, data: List[Dict[str, str]]) -> None:
     """Save data to CSV file."""
     if not data:
         return
     
     fieldnames = data[0].keys()
-    with open(file_path, 'w', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(data)
+    atomic_write(file_path, buffer.getvalue())
+
+
+def read_csv_header(file_path: str) -> List[str]:
+    """Return the column names of an existing CSV file."""
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        return next(csv.reader(f), [])
+
+
+def append_csv_data(file_path: str, data: List[Dict[str, str]]) -> None:
+    """
+    Append rows to a CSV file without rewriting it.
+    Rows are written with the file's existing columns; a missing or empty
+    file is created with a header instead.
+    """
+    if not data:
+        return
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        save_csv_data(file_path, data)
+        return
+
+    recover_append(file_path)
+    buffer = io.StringIO(newline='')
+    writer = csv.DictWriter(buffer, fieldnames=read_csv_header(file_path), extrasaction='ignore')
+    writer.writerows(data)
+
+    offset = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        f.seek(offset - 1)
+        ends_with_newline = f.read(1) == b'\n'
+    payload = buffer.getvalue() if ends_with_newline else '\r\n' + buffer.getvalue()
+    append_at(file_path, offset, payload)
 
 
 def load_json_data(file_path: str) -> List[Dict]:
-    """Load JSON data and return as list of dictionaries."""
+    """Load JSON (array or JSON Lines) data and return as list of dictionaries."""
     data = []
     if os.path.exists(file_path):
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if not isinstance(data, list):
-                    data = []
-        except Exception as e:
-            print(f"Warning: Could not read {file_path}: {e}")
+        with metrics.timer("load", {"file": os.path.basename(file_path)}) as event:
+            try:
+                data = list(iter_records(file_path))
+            except Exception as e:
+                print(f"Warning: Could not read {file_path}: {e}")
+                metrics.error("load", str(e), file=file_path)
+            event["rows"] = len(data)
     return data
 
 
-def save_json_data(file_path: str, data: List[Dict]) -> None:
-    """Save data to JSON file."""
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def iter_json_data(file_path: str) -> Iterable[Dict]:
+    """Yield JSON (array or JSON Lines) records one at a time."""
+    if not os.path.exists(file_path):
+        return
+    try:
+        yield from iter_records(file_path)
+    except Exception as e:
+        print(f"Warning: Could not read {file_path}: {e}")
+
+
+def save_json_data(file_path: str, data: Iterable[Dict]) -> None:
+    """Save data to a JSON array or JSON Lines file, streaming the records."""
+    write_records(file_path, data)
+
+
+def _json_array_end(file_path: str) -> Tuple[int, bool]:
+    """
+    Locate where new items go in a JSON array file.
+    Returns (offset, empty): offset is just after the last item (or after
+    '[' for an empty array), where the closing bracket is rewritten.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        f.seek(max(0, size - TAIL_SCAN_BYTES))
+        start = f.tell()
+        tail = f.read()
+    stripped = tail.rstrip()
+    if not stripped.endswith(b']'):
+        raise ValueError(f"{file_path} does not end with a JSON array")
+    body = stripped[:-1].rstrip()
+    if not body:
+        raise ValueError(f"Could not find the end of the last item in {file_path}")
+    return start + len(body), body.endswith(b'[')
+
+
+def append_json_data(file_path: str, data: List[Dict]) -> None:
+    """
+    Append items to a JSON array or JSON Lines file without rewriting it.
+    For an array only the closing bracket is replaced, and the result is
+    byte-for-byte what save_json_data() would write for the whole list.
+    """
+    if not data:
+        return
+    if not os.path.exists(file_path) or os.path.getsize(file_path) == 0:
+        save_json_data(file_path, data)
+        return
+
+    recover_append(file_path)
+    if is_jsonl(file_path):
+        offset = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            f.seek(offset - 1)
+            ends_with_newline = f.read(1) == b'\n'
+        payload = "".join(format_jsonl(item) for item in data)
+        append_at(file_path, offset, payload if ends_with_newline else "\n" + payload)
+        return
+
+    offset, empty = _json_array_end(file_path)
+    items = ",\n".join(format_array_item(item) for item in data)
+    payload = ("\n" if empty else ",\n") + items + "\n]"
+    append_at(file_path, offset, payload)
+
+
+def iter_csv_data(file_path: str) -> Iterable[Dict[str, str]]:
+    """Yield CSV rows one at a time."""
+    if not os.path.exists(file_path):
+        return
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    except Exception as e:
+        print(f"Warning: Could not read {file_path}: {e}")
+
+
+def iter_record_urls(file_path: str) -> Iterable[str]:
+    """Yield the URL of every record in a database CSV or contents JSON file."""
+    records = iter_csv_data(file_path) if file_path.endswith('.csv') else iter_json_data(file_path)
+    scanned = 0
+    try:
+        for record in records:
+            scanned += 1
+            url = record.get('URL', '')
+            if url:
+                yield url
+    finally:
+        metrics.count("rows_scanned", scanned, {"file": os.path.basename(file_path)})
+
+
+def open_url_index(file_path: str, readonly: bool = False) -> UrlIndex:
+    """Open the persistent URL index of an output file, rebuilding it if stale."""
+    return UrlIndex.open(file_path, lambda: iter_record_urls(file_path), readonly)
+
+
+def select_new_entries(new_data: List[Dict], index: UrlIndex) -> List[Dict]:
+    """
+    Keep the records whose normalized URL is not in the index yet.
+    Accepted URLs are added to the index, which also drops duplicates
+    within new_data itself.
+    """
+    new_entries = []
+    for record in new_data:
+        url = record.get('URL', '')
+        if url and index.add(url):
+            new_entries.append(record)
+    return new_entries
+
+
+def select_unknown_entries(new_data: List[Dict], index: UrlIndex) -> List[Dict]:
+    """
+    Like select_new_entries(), but without adding the URLs to the index, so
+    a caller can still drop some of the records before committing the rest.
+    """
+    new_entries = []
+    seen = set()
+    for record in new_data:
+        url = record.get('URL', '')
+        if not url or url in index:
+            continue
+        key = normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            new_entries.append(record)
+    return new_entries
 
 
-def merge_database(input_file: str, output_file: str) -> int:
+def merge_database(input_file: str, output_file: str, incremental: bool = True,
+                   skip_urls: Iterable[str] = ()) -> int:
     """
     Merge database files by adding new entries that don't exist in output.
+    With incremental=True the new rows are appended in place; otherwise the
+    whole output file is rewritten. Rows whose URL is in skip_urls (near
+    duplicates dropped from the contents merge) are left out.
     Returns the number of new entries added.
     """
     print(f"Merging database: {input_file} -> {output_file}")
     
-    # Load existing data
-    existing_data = load_csv_data(output_file)
     new_data = load_csv_data(input_file)
     
     if not new_data:
         print(f"No data found in {input_file}")
         return 0
     
-    # Create set of existing URLs for fast lookup
-    existing_urls: Set[str] = {row.get('URL', '') for row in existing_data}
-    
-    # Find new entries
-    new_entries = []
-    for row in new_data:
-        url = row.get('URL', '')
-        if url and url not in existing_urls:
-            new_entries.append(row)
-            existing_urls.add(url)  # Avoid duplicates within new data
-    
-    if not new_entries:
-        print("No new entries to add to database")
+    return merge_database_rows(new_data, output_file, incremental, skip_urls)
+
+
+def merge_database_rows(new_data: List[Dict[str, str]], output_file: str, incremental: bool = True,
+                        skip_urls: Iterable[str] = ()) -> int:
+    """
+    Add the rows of new_data that don't exist in output yet; see merge_database().
+    Returns the number of new entries added.
+    """
+    skip = {normalize_url(url) for url in skip_urls}
+    if skip:
+        new_data = [row for row in new_data if normalize_url(row.get('URL', '')) not in skip]
+    if not new_data:
         return 0
     
-    # Merge data
-    merged_data = existing_data + new_entries
-    
-    # Save merged data
-    save_csv_data(output_file, merged_data)
+    start = time.perf_counter()
+    new_entries = []
+    recover_append(output_file)
+    index = open_url_index(output_file)
+    try:
+        new_entries = select_new_entries(new_data, index)
+        
+        if not new_entries:
+            print("No new entries to add to database")
+            return 0
+        
+        # Store dates in ISO form whatever format the daily file used
+        for row in new_entries:
+            row['date'] = normalize_date(row.get('date', '')) or row.get('date', '')
+        
+        if incremental:
+            append_csv_data(output_file, new_entries)
+        else:
+            save_csv_data(output_file, load_csv_data(output_file) + new_entries)
+        index.save()
+    finally:
+        index.close()
+        metrics.observe("merge", time.perf_counter() - start, {"file": os.path.basename(output_file)},
+                        input_rows=len(new_data), added=len(new_entries))
     
     print(f"Added {len(new_entries)} new entries to {output_file}")
     return len(new_entries)
 
 
-def merge_contents(input_file: str, output_file: str) -> int:
+def merge_contents(input_file: str, output_file: str, incremental: bool = True,
+                   near_dup: Optional[str] = None, skipped: Optional[List[str]] = None) -> int:
     """
     Merge contents files by adding new entries that don't exist in output.
+    With incremental=True the new items are appended in place; otherwise the
+    whole output file is rewritten. near_dup ("skip" or "link") also checks
+    the new items against the archive's near-duplicate index; see near_dup.py.
+    The URLs of near duplicates left out are appended to skipped, so the
+    database merge can leave their rows out too.
+    The search index (search.py) is updated too once it has been created.
     Returns the number of new entries added.
     """
     print(f"Merging contents: {input_file} -> {output_file}")
     
-    # Load existing data
-    existing_data = load_json_data(output_file)
     new_data = load_json_data(input_file)
     
     if not new_data:
         print(f"No data found in {input_file}")
         return 0
     
-    # Create set of existing URLs for fast lookup
-    existing_urls: Set[str] = {item.get('URL', '') for item in existing_data}
-    
-    # Find new entries
-    new_entries = []
-    for item in new_data:
-        url = item.get('URL', '')
-        if url and url not in existing_urls:
-            new_entries.append(item)
-            existing_urls.add(url)  # Avoid duplicates within new data
-    
-    if not new_entries:
-        print("No new entries to add to contents")
+    return merge_contents_records(new_data, output_file, incremental, near_dup, skipped=skipped)
+
+
+def merge_contents_records(new_data: List[Dict], output_file: str, incremental: bool = True,
+                           near_dup: Optional[str] = None, dup_index: Optional[NearDupIndex] = None,
+                           skipped: Optional[List[str]] = None) -> int:
+    """
+    Add the records of new_data that don't exist in output yet; see merge_contents().
+    A long-running caller can pass the near-duplicate index it keeps open as
+    dup_index instead of having it loaded again.
+    Returns the number of new entries added.
+    """
+    if not new_data:
         return 0
     
-    # Merge data
-    merged_data = existing_data + new_entries
-    
-    # Save merged data
-    save_json_data(output_file, merged_data)
+    start = time.perf_counter()
+    new_entries = []
+    recover_append(output_file)
+    index = open_url_index(output_file)
+    if not near_dup:
+        dup_index = None
+    elif dup_index is None:
+        dup_index = open_near_dup_index(output_file)
+    search_index = open_search_index(output_file)
+    try:
+        # Near duplicates are dropped before their URLs reach the index, which
+        # must only hold what the contents file does
+        new_entries = list(iter_with_iso_dates(select_unknown_entries(new_data, index)))
+        if dup_index is not None:
+            new_entries, flagged = filter_near_duplicates(new_entries, dup_index, near_dup)
+            for record, original, score in flagged:
+                print(f"  near duplicate ({score:.2f}): {record.get('URL', '')} ~ {original}")
+                if near_dup == "skip" and skipped is not None:
+                    skipped.append(record.get('URL', ''))
+        for record in new_entries:
+            index.add(record['URL'])
+        
+        if not new_entries:
+            print("No new entries to add to contents")
+            index.save()
+            return 0
+        
+        if incremental:
+            append_json_data(output_file, new_entries)
+        else:
+            # Read strictly here: a silently truncated read would drop history
+            existing = iter_records(output_file) if os.path.exists(output_file) else []
+            save_json_data(output_file, itertools.chain(existing, new_entries))
+        index.save()
+        if dup_index is not None:
+            dup_index.save()
+        if search_index is not None:
+            search_index.add(new_entries)
+            search_index.save()
+    finally:
+        index.close()
+        metrics.observe("merge", time.perf_counter() - start, {"file": os.path.basename(output_file)},
+                        input_rows=len(new_data), added=len(new_entries))
     
     print(f"Added {len(new_entries)} new entries to {output_file}")
     return len(new_entries)
 
 
+def merge_into_store(database_in: str, contents_in: str, store_path: str) -> int:
+    """
+    Merge the daily files into the SQLite article store instead of the
+    CSV/JSON files; the store's UNIQUE URL key does the deduplication.
+    Returns the number of new entries added.
+    """
+    print(f"Merging into store: {database_in}, {contents_in} -> {store_path}")
+    store = ArticleStore(store_path)
+    try:
+        db_added = store.add_database_rows(load_csv_data(database_in))
+        content_added = store.add_contents(iter_with_iso_dates(load_json_data(contents_in)))
+    finally:
+        store.close()
+    print(f"Added {db_added} database rows and {content_added} articles to {store_path}")
+    return db_added + content_added
+
+
+def count_new_store_entries(database_in: str, contents_in: str, store_path: str) -> Tuple[int, int]:
+    """
+    Count the database rows and articles merge_into_store would add, as
+    (database, contents), without creating or writing the store.
+    """
+    store = ArticleStore(store_path if os.path.exists(store_path) else ":memory:")
+    try:
+        return (store.count_new(load_csv_data(database_in), 'database_row'),
+                store.count_new(load_json_data(contents_in), 'contents_record'))
+    finally:
+        store.close()
+
+
+def count_new_entries(new_data: List[Dict], output_file: str) -> int:
+    """Count what a merge would add, without writing the output or its index."""
+    index = open_url_index(output_file, readonly=True)
+    try:
+        return len(select_new_entries(new_data, index))
+    finally:
+        index.close()
+
+
 def main():
     """Main function to handle command line arguments and execute merge operations."""
     parser = argparse.ArgumentParser(
@@ -147,6 +475,9 @@ Examples:
   python merge.py
   python merge.py --database-in today-data.csv --database-out main-data.csv
   python merge.py --contents-in today-content.json --contents-out main-content.json
+  python merge.py --contents-out contents.jsonl
+  python merge.py --store articles.db
+  python merge.py --profile profiles
         """
     )
     
@@ -171,7 +502,24 @@ Examples:
     parser.add_argument(
         '--contents-out',
         default='contents.json',
-        help='Output contents JSON file (default: contents.json)'
+        help='Output contents JSON (.json array or .jsonl) file (default: contents.json)'
+    )
+    
+    parser.add_argument(
+        '--store',
+        help='Merge into this SQLite article store instead of the CSV/JSON output files'
+    )
+    
+    parser.add_argument(
+        '--full-rewrite',
+        action='store_true',
+        help='Rewrite the output files in full instead of appending the new entries'
+    )
+    
+    parser.add_argument(
+        '--near-dup',
+        choices=NEAR_DUP_MODES,
+        help='Skip new contents entries that are near duplicates of archived ones, or link them with duplicate_of'
     )
     
     parser.add_argument(
@@ -180,11 +528,20 @@ Examples:
         help='Show what would be merged without actually writing files'
     )
     
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    configure_metrics("merge", args)
+    install_profiling("merge", args, (sys.modules[__name__], PROFILE_TARGETS))
+    if args.store and args.near_dup:
+        parser.error("--near-dup applies to the contents file and cannot be used with --store")
     
     print("=== Database and Contents Merge Tool ===")
-    print(f"Database: {args.database_in} -> {args.database_out}")
-    print(f"Contents: {args.contents_in} -> {args.contents_out}")
+    if args.store:
+        print(f"Store: {args.database_in}, {args.contents_in} -> {args.store}")
+    else:
+        print(f"Database: {args.database_in} -> {args.database_out}")
+        print(f"Contents: {args.contents_in} -> {args.contents_out}")
     print()
     
     if args.dry_run:
@@ -208,29 +565,40 @@ Examples:
     total_added = 0
     
     try:
-        # Merge database
+        if args.store and args.dry_run:
+            db_count, content_count = count_new_store_entries(args.database_in, args.contents_in, args.store)
+            print(f"Would add {db_count} database rows and {content_count} articles to {args.store}")
+            print()
+            print("Dry run completed - no files were modified")
+            return
+        
+        if args.store:
+            total_added = merge_into_store(args.database_in, args.contents_in, args.store)
+            print()
+            print(f"Merge completed successfully! Total new entries: {total_added}")
+            return
+        
+        # Merge contents first: database.csv marks a URL as collected, so an
+        # interrupted merge leaves the articles to be collected again, and the
+        # near duplicates skipped here stay out of the database as well
+        skipped = []
         if args.dry_run:
             # For dry run, just check what would be added
-            existing_db = load_csv_data(args.database_out)
-            new_db = load_csv_data(args.database_in)
-            existing_urls = {row.get('URL', '') for row in existing_db}
-            new_entries = [row for row in new_db if row.get('URL', '') and row.get('URL', '') not in existing_urls]
-            print(f"Would add {len(new_entries)} new database entries")
+            new_count = count_new_entries(load_json_data(args.contents_in), args.contents_out)
+            print(f"Would add {new_count} new content entries")
         else:
-            db_added = merge_database(args.database_in, args.database_out)
-            total_added += db_added
+            content_added = merge_contents(args.contents_in, args.contents_out, not args.full_rewrite,
+                                           args.near_dup, skipped)
+            total_added += content_added
         
-        # Merge contents
+        # Merge database
         if args.dry_run:
             # For dry run, just check what would be added
-            existing_content = load_json_data(args.contents_out)
-            new_content = load_json_data(args.contents_in)
-            existing_urls = {item.get('URL', '') for item in existing_content}
-            new_entries = [item for item in new_content if item.get('URL', '') and item.get('URL', '') not in existing_urls]
-            print(f"Would add {len(new_entries)} new content entries")
+            new_count = count_new_entries(load_csv_data(args.database_in), args.database_out)
+            print(f"Would add {new_count} new database entries")
         else:
-            content_added = merge_contents(args.contents_in, args.contents_out)
-            total_added += content_added
+            db_added = merge_database(args.database_in, args.database_out, not args.full_rewrite, skipped)
+            total_added += db_added
         
         print()
         if args.dry_run:
@@ -240,6 +608,7 @@ Examples:
         
     except Exception as e:
         print(f"Error during merge: {e}")
+        metrics.error("merge", str(e))
         sys.exit(1)
 
 
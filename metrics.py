@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Timers and counters for the collector, merge and render scripts.
+Instrumented code records into the module-level `metrics` registry, which
+does nothing beyond a perf_counter() call until configure() enables it:
+  --metrics-log FILE   one JSON object per event (a feed, a fetch, a merge,
+                       a render ...) appended to FILE, or written to stderr
+                       for "-"
+  --metrics-prom FILE  Prometheus text format, rewritten by flush(), for the
+                       node_exporter textfile collector
+Labels are the low-cardinality dimensions aggregated into Prometheus series
+(feed, host, file, stage); other fields, such as URLs, go to the JSON log
+only. Timers are exported as news_<name>_seconds_sum/_count/_max and
+counters as news_<name>_total.
+
+`python metrics.py FILE` summarizes a JSON log by event.
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+PREFIX = "news_"
+
+
+def _label_key(labels: Optional[Dict]) -> Tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: Tuple) -> str:
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of timers and counters with optional JSON and Prometheus output."""
+
+    def __init__(self):
+        self.enabled = False
+        self.job = ""
+        self.prometheus_file = None
+        self._log = None
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._timers = defaultdict(lambda: [0, 0.0, 0.0])
+        self._counters = defaultdict(float)
+
+    def configure(self, job: str, json_log: Optional[str] = None, prometheus_file: Optional[str] = None,
+                  record: bool = False) -> None:
+        """
+        Enable recording when either output is given, or with record=True to
+        keep the values in memory only (read back with total()); job labels
+        every series and event.
+        """
+        self.job = job
+        self.prometheus_file = prometheus_file
+        if json_log == "-":
+            self._log = sys.stderr
+        elif json_log:
+            self._log = open(json_log, 'a', encoding='utf-8')
+        self.enabled = bool(self._log or prometheus_file or record)
+        self._started = time.time()
+
+    def _emit(self, event: str, fields: Dict) -> None:
+        if self._log is None:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "job": self.job, "event": event, **fields},
+                          ensure_ascii=False, default=str)
+        with self._lock:
+            self._log.write(line + "\n")
+            self._log.flush()
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict] = None, **fields) -> None:
+        """Record one duration; fields only go to the JSON log."""
+        if not self.enabled:
+            return
+        with self._lock:
+            timer = self._timers[(name, _label_key(labels))]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+        self._emit(name, {**(labels or {}), **fields, "seconds": round(seconds, 4)})
+
+    def count(self, name: str, value: float = 1, labels: Optional[Dict] = None) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, _label_key(labels))] += value
+
+    def total(self, name: str) -> float:
+        """Sum of a counter over all its labels."""
+        with self._lock:
+            return sum(value for (counter_name, _), value in self._counters.items() if counter_name == name)
+
+    def error(self, stage: str, message: str, **fields) -> None:
+        """Count an error of a stage and log it."""
+        if not self.enabled:
+            return
+        self.count("errors", labels={"stage": stage})
+        self._emit("error", {"stage": stage, "message": message, **fields})
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict] = None, **fields) -> Iterator[Dict]:
+        """
+        Time a block. The yielded dict collects extra fields for the event,
+        such as sizes known only at the end; an exception is recorded in it.
+        """
+        extra = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield extra
+        except BaseException as e:
+            extra["error"] = repr(e)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, labels, **extra)
+
+    def prometheus_text(self) -> str:
+        job = (("job", self.job),) if self.job else ()
+        lines = []
+        with self._lock:
+            timers = sorted(self._timers.items())
+            counters = sorted(self._counters.items())
+        timer_names = sorted({name for (name, _), _ in timers})
+        for suffix, index, kind in (("seconds_sum", 1, "counter"), ("seconds_count", 0, "counter"),
+                                    ("seconds_max", 2, "gauge")):
+            for name in timer_names:
+                metric = f"{PREFIX}{name}_{suffix}"
+                lines.append(f"# TYPE {metric} {kind}")
+                for (timer_name, key), values in timers:
+                    if timer_name == name:
+                        lines.append(f"{metric}{_format_labels(job + key)} {values[index]:.6g}")
+        for name in sorted({name for (name, _), _ in counters}):
+            metric = f"{PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (counter_name, key), value in counters:
+                if counter_name == name:
+                    lines.append(f"{metric}{_format_labels(job + key)} {value:.6g}")
+        metric = f"{PREFIX}last_run_timestamp_seconds"
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric}{_format_labels(job)} {time.time():.3f}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self) -> None:
+        """Rewrite the Prometheus file, if configured, with everything recorded so far."""
+        if not self.enabled or not self.prometheus_file:
+            return
+        temp_path = self.prometheus_file + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, self.prometheus_file)
+
+    def close(self) -> None:
+        """Log the run's duration, flush the Prometheus file and close the JSON log."""
+        if not self.enabled:
+            return
+        self.observe("run", time.time() - self._started)
+        self.flush()
+        if self._log not in (None, sys.stderr):
+            self._log.close()
+        self._log = None
+        self.enabled = False
+
+
+metrics = Metrics()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The --metrics-log / --metrics-prom options shared by the scripts."""
+    parser.add_argument('--metrics-log', metavar='FILE',
+                        help='Append structured JSON events (timings, sizes, errors) to FILE, or "-" for stderr')
+    parser.add_argument('--metrics-prom', metavar='FILE',
+                        help='Write timings and counters in Prometheus text format to FILE')
+
+
+def configure_from_args(job: str, args) -> None:
+    """Enable the registry from the parsed options; it is closed when the process exits."""
+    metrics.configure(job, args.metrics_log, args.metrics_prom)
+    if metrics.enabled:
+        atexit.register(metrics.close)
+
+
+def summarize_log(path: str) -> Dict[str, Dict]:
+    """Count, total, average and max seconds per event of a JSON log."""
+    summary = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if "seconds" not in event:
+                continue
+            key = f"{event.get('job', '')}:{event['event']}"
+            entry = summary.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+            entry["count"] += 1
+            entry["total"] += event["seconds"]
+            entry["max"] = max(entry["max"], event["seconds"])
+    for entry in summary.values():
+        entry["average"] = entry["total"] / entry["count"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize a metrics JSON log by event",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python news_collector.py --metrics-log metrics.jsonl --metrics-prom collector.prom
+  python metrics.py metrics.jsonl
+        """
+    )
+    parser.add_argument('log_file', help='JSON log written with --metrics-log')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log_file):
+        print(f"Error: File '{args.log_file}' not found.")
+        sys.exit(1)
+
+    summary = summarize_log(args.log_file)
+    print(f"{'event':<28} {'count':>7} {'total s':>10} {'avg s':>9} {'max s':>9}")
+    for key, entry in sorted(summary.items(), key=lambda item: -item[1]["total"]):
+        print(f"{key:<28} {entry['count']:>7} {entry['total']:>10.3f} {entry['average']:>9.4f} {entry['max']:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
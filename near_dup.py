@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate article detection with MinHash and LSH.
+Each article's topic and source are reduced to word 5-gram shingles and a
+64-value MinHash signature. Signatures are split into 16 bands of 4 values;
+articles sharing a band are candidates, and a candidate whose estimated
+Jaccard similarity reaches the threshold is a near duplicate. Only the
+buckets an article falls into are looked at, so lookups do not scan the
+archive.
+
+The index is kept next to the contents file (contents.json.neardup) as an
+append-only JSON Lines file of signatures. Like the URL index, it remembers
+the contents file's size and is rebuilt when the file changed behind its back.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from json_records import iter_records, write_records
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+MIN_WORDS = 20
+DEFAULT_THRESHOLD = 0.8
+MODES = ("skip", "link")
+WORD = re.compile(r'\w+')
+
+# One extendable-output hash per shingle yields all NUM_PERM hash values at once
+_UNPACK_HASHES = struct.Struct(f'>{NUM_PERM}Q').unpack
+
+
+def article_text(record: Dict) -> str:
+    return f"{record.get('topic', '')}\n{record.get('source', '')}"
+
+
+def shingles(text: str) -> set:
+    """The word 5-grams of a text; empty when the text is too short to compare."""
+    words = WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> Optional[Tuple[int, ...]]:
+    """
+    MinHash signature of a text, or None when it is too short to compare.
+    Each shingle is hashed once with SHAKE-128 into NUM_PERM 64-bit values,
+    one per hash function, and the signature is their column-wise minimum.
+    """
+    values = shingles(text)
+    if not values:
+        return None
+    rows = [_UNPACK_HASHES(hashlib.shake_128(shingle.encode('utf-8')).digest(NUM_PERM * 8)) for shingle in values]
+    return tuple(map(min, zip(*rows)))
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+
+
+def _bands(sig: Tuple[int, ...]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+    for band in range(BANDS):
+        yield band, sig[band * ROWS:(band + 1) * ROWS]
+
+
+def _pack(sig: Tuple[int, ...]) -> str:
+    return struct.pack(f'>{NUM_PERM}Q', *sig).hex()
+
+
+def _unpack(data: str) -> Tuple[int, ...]:
+    return _UNPACK_HASHES(bytes.fromhex(data))
+
+
+class NearDupIndex:
+    """URL -> MinHash signature map with LSH buckets, persisted next to a contents file."""
+
+    def __init__(self, data_file: str, readonly: bool = False):
+        self.data_file = data_file
+        self.readonly = readonly
+        self.path = data_file + '.neardup'
+        self.meta_path = data_file + '.neardup.meta'
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._pending: List[Tuple[str, Tuple[int, ...]]] = []
+
+    @classmethod
+    def open(cls, data_file: str, iter_records_fn: Callable[[], Iterable[Dict]],
+             readonly: bool = False) -> 'NearDupIndex':
+        """
+        Open the index for data_file, rebuilding it from iter_records_fn() when
+        it is missing or stale. A readonly index never writes to disk.
+        """
+        index = cls(data_file, readonly)
+        if index.is_current():
+            index._load()
+        else:
+            if os.path.exists(data_file):
+                print(f"Building near-duplicate index for {data_file}...")
+            index.rebuild(iter_records_fn())
+        return index
+
+    def _data_size(self) -> int:
+        return os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+
+    def is_current(self) -> bool:
+        """Whether the saved index matches the contents file as it is on disk."""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return False
+        return os.path.exists(self.path) and meta.get("data_size") == self._data_size()
+
+    def _insert(self, url: str, sig: Tuple[int, ...]) -> None:
+        self.signatures[url] = sig
+        for band, key in _bands(sig):
+            self.buckets[band][key].append(url)
+
+    def _load(self) -> None:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash
+                    continue
+                self._insert(record["url"], _unpack(record["sig"]))
+
+    def find(self, sig: Optional[Tuple[int, ...]], threshold: float = DEFAULT_THRESHOLD) -> Optional[Tuple[str, float]]:
+        """The most similar indexed article at or above threshold, as (url, similarity)."""
+        if sig is None:
+            return None
+        candidates = set()
+        for band, key in _bands(sig):
+            candidates.update(self.buckets[band].get(key, ()))
+        best = None
+        for url in candidates:
+            score = similarity(sig, self.signatures[url])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (url, score)
+        return best
+
+    def add(self, url: str, sig: Optional[Tuple[int, ...]]) -> None:
+        if sig is None or url in self.signatures:
+            return
+        self._insert(url, sig)
+        self._pending.append((url, sig))
+
+    def rebuild(self, records: Iterable[Dict]) -> None:
+        """Replace the index contents with the signatures of the given records."""
+        self.signatures = {}
+        self.buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._pending = []
+        for record in records:
+            url = record.get('URL', '')
+            if url:
+                self.add(url, signature(article_text(record)))
+        if self.readonly:
+            self._pending = []
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for url, sig in self._pending:
+                f.write(json.dumps({"url": url, "sig": _pack(sig)}, ensure_ascii=False) + "\n")
+        os.replace(temp_path, self.path)
+        self._pending = []
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"data_size": self._data_size(), "count": len(self.signatures)}, f)
+        os.replace(temp_path, self.meta_path)
+
+    def save(self) -> None:
+        """
+        Append the signatures added since the last save and record the data
+        file's current size. Call it after the data file itself has been written.
+        """
+        if self.readonly:
+            return
+        if self._pending:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for url, sig in self._pending:
+                    f.write(json.dumps({"url": url, "sig": _pack(sig)}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+        self._write_meta()
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+
+def open_near_dup_index(contents_file: str, readonly: bool = False) -> NearDupIndex:
+    """Open the near-duplicate index of a contents file, rebuilding it if stale."""
+    return NearDupIndex.open(
+        contents_file, lambda: iter_records(contents_file) if os.path.exists(contents_file) else [], readonly)
+
+
+def filter_near_duplicates(records: Iterable[Dict], index: NearDupIndex, mode: str = "skip",
+                           threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[Dict], List[Tuple[Dict, str, float]]]:
+    """
+    Check records against the index and against each other, in order.
+    mode "skip" drops near duplicates; "link" keeps them with a duplicate_of
+    field naming the earlier article. Kept records are added to the index.
+    Returns (kept, flagged) where flagged holds (record, original_url, similarity).
+    """
+    kept = []
+    flagged = []
+    for record in records:
+        sig = signature(article_text(record))
+        match = index.find(sig, threshold)
+        if match:
+            flagged.append((record, match[0], match[1]))
+            if mode == "skip":
+                continue
+            record['duplicate_of'] = match[0]
+        index.add(record.get('URL', ''), sig)
+        kept.append(record)
+    return kept, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate articles with MinHash/LSH",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python near_dup.py rebuild contents.json
+  python near_dup.py filter contents.json -i contents-today.temp.json
+  python near_dup.py filter contents.json -i contents-today.temp.json --mode link
+        """
+    )
+    parser.add_argument('command', choices=['rebuild', 'filter'], help='Action to perform')
+    parser.add_argument('contents_file', help='Archive contents file the index belongs to')
+    parser.add_argument('--input', '-i', default='contents-today.temp.json',
+                        help='Articles to filter in place (default: contents-today.temp.json)')
+    parser.add_argument('--mode', choices=MODES, default='skip', help='Drop or link near duplicates (default: skip)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Estimated Jaccard similarity that counts as a duplicate (default: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        if not os.path.exists(args.contents_file):
+            print(f"Error: File '{args.contents_file}' not found.")
+            sys.exit(1)
+        index = NearDupIndex(args.contents_file)
+        index.rebuild(iter_records(args.contents_file))
+        print(f"Indexed {len(index)} articles from {args.contents_file}")
+        return
+
+    if not os.path.exists(args.input):
+        print(f"Error: File '{args.input}' not found.")
+        sys.exit(1)
+    # Read-only: the archive index is only updated when the articles are merged
+    index = open_near_dup_index(args.contents_file, readonly=True)
+    records = list(iter_records(args.input))
+    kept, flagged = filter_near_duplicates(records, index, args.mode, args.threshold)
+    for record, original, score in flagged:
+        print(f"  near duplicate ({score:.2f}): {record.get('URL', '')} ~ {original}")
+    write_records(args.input, kept, indent=4)
+    action = "Removed" if args.mode == "skip" else "Linked"
+    print(f"{action} {len(flagged)} near duplicates; {len(kept)} articles left in {args.input}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,31 @@
 import sys
 sys.path.insert(0, '/usr/src/app/local_libs')
 
+import argparse
 import csv
 import json
+import os
+import threading
+import time
 import requests
 import feedparser
-from bs4 import BeautifulSoup
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from dates import today_iso
+from merge import iter_record_urls
+from metrics import add_arguments as add_metrics_arguments, configure_from_args as configure_metrics, metrics
+from near_dup import MODES as NEAR_DUP_MODES
+from profiling import add_arguments as add_profile_arguments, install_from_args as install_profiling
+from summarizer import BACKENDS as SUMMARIZER_BACKENDS
+from url_index import UrlIndex
+from extractors import BACKENDS as EXTRACTOR_BACKENDS, DEFAULT_BACKEND as DEFAULT_EXTRACTOR
+from extractors import extract_text, get_main_content  # noqa: F401  (get_main_content re-exported)
+from response_cache import DEFAULT_CACHE_DIR, ResponseCache
+from text_budget import DEFAULT_MAX_TOKENS as DEFAULT_SOURCE_BUDGET, save_report, summarize_report, trim_articles
 
 # Configuration
 RSS_FEEDS = {
@@ -17,79 +36,405 @@ RSS_FEEDS = {
     "The Verge": "https://www.theverge.com/rss/index.xml",
     "Engadget": "https://www.engadget.com/rss.xml",
 }
-TODAY_DATE = datetime.now().strftime("%Y-%m-%d")
+TODAY_DATE = today_iso()
 CSV_OUTPUT_FILE = "database-today.csv"
 JSON_OUTPUT_FILE = "contents-today.temp.json"
+FEED_STATE_FILE = "feed-state.json"
+DATABASE_FILE = "database.csv"
+MAX_ENTRIES_PER_FEED = 20
+# Wrapped with --profile: page parsing and get_main_content()
+PROFILE_TARGETS = ("extract_text",)
+
+# Daemon mode: each feed is polled on its own interval within these bounds
+SCHEDULE_FILE = "feed-schedule.json"
+MIN_POLL_INTERVAL = 300
+MAX_POLL_INTERVAL = 6 * 3600
+INITIAL_POLL_INTERVAL = 1800
+BACKOFF_FACTOR = 1.5
+CHANGE_GAP_WEIGHT = 0.3
+
+# Concurrency limits for the threaded collection mode
+MAX_WORKERS = 8
+MAX_PER_HOST = 2
+
+# HTTP settings shared by feed and article downloads
+USER_AGENT = 'Mozilla/5.0 '
+REQUEST_TIMEOUT = 15
+RETRY_TOTAL = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+_print_lock = threading.Lock()
+
+def log(message):
+    """Print a progress line without interleaving output from worker threads."""
+    with _print_lock:
+        print(message)
+
+
+class RequestLimiter:
+    """Bound the number of in-flight requests, globally and per host."""
 
-def get_main_content(soup):
-    """Extract main article text from a BeautifulSoup object."""
-    # Try common article tags
-    main_content = soup.find("article")
-    if not main_content:
-        main_content = soup.find("main")
-    
-    # Fallback to common content div classes
-    if not main_content:
-        content_divs = soup.find_all("div", class_=[ "post-content", "article-content", "entry-content", "post-body", "article-body" ])
-        if content_divs:
-            main_content = content_divs[0]
-
-    # Generic fallback: get all text from body, but try to remove nav/footer
-    if not main_content:
-        main_content = soup.body
-        if main_content:
-            for tag in main_content.find_all(['nav', 'footer', 'header', 'script', 'style']):
-                tag.decompose()
-
-    if main_content:
-        return main_content.get_text(separator='\n', strip=True)
-    return ""
-
-def process_feeds():
-    """Fetch, parse, and process articles from RSS feeds."""
+    def __init__(self, max_in_flight=MAX_WORKERS, max_per_host=MAX_PER_HOST):
+        self.max_per_host = max_per_host
+        self._global = threading.BoundedSemaphore(max_in_flight)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._hosts[host]
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one global slot and one slot for the URL's host."""
+        host_semaphore = self._host_semaphore(url)
+        with host_semaphore, self._global:
+            yield
+
+
+class SessionPool:
+    """
+    One keep-alive requests.Session per host, with a shared retry policy.
+    Every request made through fetch() is timed and recorded in `timings`.
+    """
+
+    def __init__(self, retries=RETRY_TOTAL, backoff=RETRY_BACKOFF, pool_size=MAX_PER_HOST, timeout=REQUEST_TIMEOUT):
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.timings = []
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self):
+        retry = Retry(
+            total=self.retries,
+            backoff_factor=self.backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def session_for(self, url):
+        """Return the pooled session for the URL's host, creating it on first use."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = self._new_session()
+            return self._sessions[host]
+
+    def fetch(self, url, headers=None):
+        """GET a URL through its host's session and record how long it took."""
+        session = self.session_for(url)
+        start = time.perf_counter()
+        status = None
+        size = 0
+        try:
+            response = session.get(url, headers=headers, timeout=self.timeout)
+            status = response.status_code
+            size = len(response.content)
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            host = urlparse(url).netloc.lower()
+            with self._lock:
+                self.timings.append({
+                    "host": host,
+                    "url": url,
+                    "status": status,
+                    "bytes": size,
+                    "seconds": round(elapsed, 4),
+                })
+            metrics.observe("request", elapsed, {"host": host}, url=url, status=status, bytes=size)
+            metrics.count("downloaded_bytes", size, {"host": host})
+            if status is None:
+                metrics.count("errors", labels={"stage": "request"})
+
+    def timing_summary(self):
+        """Per-host request count, first-request time and average of the reused-connection requests."""
+        by_host = {}
+        for timing in self.timings:
+            by_host.setdefault(timing["host"], []).append(timing["seconds"])
+        summary = {}
+        for host, seconds in by_host.items():
+            rest = seconds[1:]
+            summary[host] = {
+                "requests": len(seconds),
+                "total_seconds": round(sum(seconds), 4),
+                "first_seconds": seconds[0],
+                "reused_avg_seconds": round(sum(rest) / len(rest), 4) if rest else None,
+            }
+        return summary
+
+    def close(self):
+        for session in self._sessions.values():
+            session.close()
+
+
+def load_feed_state(file_path):
+    """Load the saved ETag/Last-Modified validators, keyed by feed URL."""
+    if not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (IOError, ValueError) as e:
+        print(f"Warning: Could not read {file_path}: {e}")
+        return {}
+
+def save_feed_state(file_path, state):
+    """Atomically write the feed validators back to disk."""
+    temp_path = file_path + '.tmp'
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(temp_path, file_path)
+    except IOError as e:
+        print(f"Error writing feed state file: {e}")
+
+def conditional_headers(validators, known_urls=None):
+    """
+    Build If-None-Match / If-Modified-Since headers from saved validators.
+    The validators are only trusted once every article collected with them
+    ("pending") has reached the database: until merge has taken them, a 304
+    would hide articles that were never archived.
+    """
+    headers = {}
+    if known_urls is not None and any(link not in known_urls for link in validators.get("pending", ())):
+        return headers
+    if validators.get("etag"):
+        headers['If-None-Match'] = validators["etag"]
+    if validators.get("last_modified"):
+        headers['If-Modified-Since'] = validators["last_modified"]
+    return headers
+
+def load_known_urls(file_path):
+    """
+    Open the database's persistent URL index read-only.
+    Lookups are O(1)/O(log n) and ignore tracking parameters, http/https and
+    trailing slashes; see url_index.normalize_url().
+    """
+    return UrlIndex.open(file_path, lambda: iter_record_urls(file_path), readonly=True)
+
+def entries_newest_first(entries):
+    """Order feed entries newest-first when every entry carries a date; otherwise keep feed order."""
+    dates = [entry.get('published_parsed') or entry.get('updated_parsed') for entry in entries]
+    if all(dates):
+        order = sorted(range(len(entries)), key=lambda i: dates[i], reverse=True)
+        return [entries[i] for i in order]
+    return list(entries)
+
+def select_new_entries(entries, known_urls, all_entries=False, max_entries=MAX_ENTRIES_PER_FEED, retry=()):
+    """
+    Pick the entries to download.
+    Only the latest entry is considered unless all_entries is set, in which
+    case entries are walked newest-first until the first URL already known.
+    Entries whose URL is in retry (pending from an earlier run: a failed
+    download, or an article that never reached the database) are picked
+    wherever they are in the feed, as long as they are still unknown.
+    """
+    candidates = entries_newest_first(entries)
+    if not all_entries:
+        candidates = candidates[:1]
+    elif max_entries:
+        candidates = candidates[:max_entries]
+
+    selected = []
+    for entry in candidates:
+        if entry.get('link', '') in known_urls:
+            break
+        selected.append(entry)
+    if retry:
+        retry = set(retry)
+        chosen = {entry.get('link', '') for entry in selected}
+        selected.extend(entry for entry in entries_newest_first(entries)
+                        if entry.get('link', '') in retry and entry.get('link', '') not in chosen
+                        and entry.get('link', '') not in known_urls)
+    return selected
+
+def fetch_article(entry, limiter, sessions, cache=None, extractor=DEFAULT_EXTRACTOR):
+    """
+    Download one feed entry's page and return its JSON article record.
+    Pages already in the response cache are parsed without touching the network.
+    """
+    article_url = entry.link
+    start = time.perf_counter()
+    content = cache.get(article_url) if cache else None
+    cached = content is not None
+    if content is None:
+        with limiter.slot(article_url):
+            response = sessions.fetch(article_url)
+        response.raise_for_status()
+        content = response.content
+        if cache:
+            cache.put(article_url, content)
+    else:
+        log(f"  - Using cached page for {article_url}")
+    with metrics.timer("extract", {"backend": extractor}, url=article_url, bytes=len(content)) as event:
+        source_text = extract_text(content, extractor)
+        event["chars"] = len(source_text)
+    if not source_text:
+        log(f"Warning: Could not extract main content from {article_url}")
+    metrics.observe("article", time.perf_counter() - start, url=article_url, cached=cached, bytes=len(content))
+
+    return {
+        "date": TODAY_DATE,
+        "topic": entry.title,
+        "URL": article_url,
+        "source": source_text,
+    }
+
+def process_feed(name, url, limiter=None, sessions=None, feed_state=None, known_urls=None,
+                 all_entries=False, max_entries=MAX_ENTRIES_PER_FEED, cache=None, extractor=DEFAULT_EXTRACTOR):
+    """
+    Fetch one feed and its new articles.
+    Returns (csv_rows, json_articles) for this feed; errors are logged and
+    yield empty lists so one feed never affects the others.
+    When feed_state is given, the feed is requested conditionally and a 304
+    skips it entirely. The new validators are stored together with the URLs
+    collected or failed ("pending"); they are not used again until those
+    URLs are in the database, and pending URLs still in the feed are
+    downloaded again on the next run.
+    Entries whose URL is in known_urls are never downloaded; see
+    select_new_entries() for how entries are chosen.
+    """
     csv_rows = []
     json_articles = []
+    limiter = limiter or RequestLimiter()
+    sessions = sessions or SessionPool()
+    known_urls = known_urls if known_urls is not None else set()
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        log(f"Fetching {name}...")
+        headers = conditional_headers(feed_state.get(url, {}), known_urls) if feed_state is not None else None
+        with limiter.slot(url):
+            feed_response = sessions.fetch(url, headers=headers)
+        if feed_response.status_code == 304:
+            log(f"  - {name} not modified since last run, skipping.")
+            outcome = "not_modified"
+            # Only sent when every pending article was merged
+            feed_state[url].pop("pending", None)
+            return csv_rows, json_articles
+        feed_response.raise_for_status()
+        validators = {
+            "etag": feed_response.headers.get('ETag'),
+            "last_modified": feed_response.headers.get('Last-Modified'),
+        }
+        feed = feedparser.parse(feed_response.content, response_headers=feed_response.headers)
+        if not feed.entries:
+            log(f"Warning: No entries found for {name}")
+            outcome = "empty"
+            return csv_rows, json_articles
 
-    print("Starting to process feeds...")
-    for name, url in RSS_FEEDS.items():
-        try:
-            print(f"Fetching {name}...")
-            feed = feedparser.parse(url)
-            if not feed.entries:
-                print(f"Warning: No entries found for {name}")
+        retry = feed_state.get(url, {}).get("pending", ()) if feed_state is not None else ()
+        entries = select_new_entries(feed.entries, known_urls, all_entries, max_entries, retry)
+        if not entries:
+            log(f"  - No new articles for {name}.")
+
+        failed = []
+        for entry in entries:
+            log(f"  - Article: '{entry.title}'")
+            log(f"  - URL: {entry.link}")
+            try:
+                # Fetch and parse full article for JSON
+                json_articles.append(fetch_article(entry, limiter, sessions, cache, extractor))
+            except Exception as e:
+                log(f"Error fetching {entry.link}: {e}")
+                metrics.error("article", str(e), feed=name, url=entry.link)
+                failed.append(entry.link)
                 continue
+            # Add to CSV data
+            csv_rows.append([TODAY_DATE, entry.link, entry.title])
+            known_urls.add(entry.link)
+        log(f"  - Done with {name}.")
 
-            latest_entry = feed.entries[0]
-            article_url = latest_entry.link
-            article_title = latest_entry.title
+        if feed_state is not None:
+            feed_state[url] = {key: value for key, value in validators.items() if value}
+            pending = [row[1] for row in csv_rows] + failed
+            if pending:
+                feed_state[url]["pending"] = pending
+        if failed:
+            outcome = "partial"
 
-            print(f"  - Latest article: '{article_title}'")
-            print(f"  - URL: {article_url}")
+    except Exception as e:
+        log(f"Error processing {name}: {e}")
+        metrics.error("feed", str(e), feed=name)
+        outcome = "error"
+    finally:
+        metrics.observe("feed", time.perf_counter() - start, {"feed": name},
+                        outcome=outcome, new_articles=len(json_articles))
+        metrics.count("new_articles", len(json_articles), {"feed": name})
+    return csv_rows, json_articles
 
-            # Add to CSV data
-            csv_rows.append([TODAY_DATE, article_url, article_title])
-
-            # Fetch and parse full article for JSON
-            print(f"  - Fetching full content...")
-            response = requests.get(article_url, headers={'User-Agent': 'Mozilla/5.0 '}, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            source_text = get_main_content(soup)
-            if not source_text:
-                print(f"Warning: Could not extract main content from {article_url}")
-
-            json_articles.append({
-                "date": TODAY_DATE,
-                "topic": article_title,
-                "URL": article_url,
-                "source": source_text,
-            })
-            print(f"  - Done with {name}.")
-
-        except Exception as e:
-            print(f"Error processing {name}: {e}")
+def collect_articles(workers=1, max_per_host=MAX_PER_HOST, retries=RETRY_TOTAL, backoff=RETRY_BACKOFF, timings_file=None,
+                     feed_state_file=FEED_STATE_FILE, database_file=DATABASE_FILE, all_entries=False,
+                     max_entries=MAX_ENTRIES_PER_FEED, cache_dir=DEFAULT_CACHE_DIR, extractor=DEFAULT_EXTRACTOR,
+                     source_budget=None, trim_report_file=None):
+    """
+    Fetch, parse, and process articles from RSS feeds.
+    With workers > 1 each feed runs in its own thread; results are still
+    returned in RSS_FEEDS order. Pass feed_state_file=None to disable
+    conditional requests. URLs already in database_file are loaded once
+    and never downloaded again. Article pages are kept in the response cache
+    at cache_dir (None disables it) so a re-run does not download them again.
+    With a source_budget the article texts are stripped of boilerplate and
+    cut to that many estimated tokens (0 means no limit); see text_budget.py.
+    Returns (csv_rows, json_articles).
+    """
+    csv_rows = []
+    json_articles = []
+
+    print("Starting to process feeds...")
+    limiter = RequestLimiter(max(workers, 1), max_per_host)
+    sessions = SessionPool(retries=retries, backoff=backoff, pool_size=max_per_host)
+    feed_state = load_feed_state(feed_state_file) if feed_state_file else None
+    known_urls = load_known_urls(database_file)
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    feed_options = dict(limiter=limiter, sessions=sessions, feed_state=feed_state, known_urls=known_urls,
+                        all_entries=all_entries, max_entries=max_entries, cache=cache, extractor=extractor)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(process_feed, name, url, **feed_options) for name, url in RSS_FEEDS.items()]
+            results = [future.result() for future in futures]
+    else:
+        results = [process_feed(name, url, **feed_options) for name, url in RSS_FEEDS.items()]
+    sessions.close()
+    if cache:
+        cache.close()
+    report_timings(sessions, timings_file)
+    if feed_state_file:
+        save_feed_state(feed_state_file, feed_state)
 
+    for feed_rows, feed_articles in results:
+        csv_rows.extend(feed_rows)
+        json_articles.extend(feed_articles)
+
+    if source_budget is not None:
+        report = trim_articles(json_articles, source_budget or None)
+        before, after = summarize_report(report)
+        print(f"\nTrimmed article sources: ~{before} -> ~{after} tokens")
+        if trim_report_file:
+            save_report(report, trim_report_file)
+    return csv_rows, json_articles
+
+
+def write_daily_files(csv_rows, json_articles):
+    """Write collected rows and articles to the daily CSV and JSON files."""
     # Write CSV file
     print(f"\nWriting data to {CSV_OUTPUT_FILE}...")
     try:
@@ -112,5 +457,342 @@ def process_feeds():
         print(f"Error writing JSON file: {e}")
 
 
+def process_feeds(**options):
+    """Collect articles (see collect_articles) and write them to the daily files."""
+    write_daily_files(*collect_articles(**options))
+
+
+class FeedSchedule:
+    """
+    Per-feed polling intervals for the daemon mode, persisted as JSON.
+    A feed that had new articles is next polled after half its smoothed gap
+    between changes; one that had nothing new backs off by BACKOFF_FACTOR.
+    Intervals stay within [min_interval, max_interval].
+    """
+
+    def __init__(self, path=SCHEDULE_FILE, feeds=None, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.feeds = dict(feeds if feeds is not None else RSS_FEEDS)
+        self.state = load_feed_state(path) if path else {}
+        now = time.time()
+        for url in self.feeds.values():
+            entry = self.state.setdefault(url, {})
+            entry["interval"] = self._clamp(entry.get("interval", INITIAL_POLL_INTERVAL))
+            entry.setdefault("next_poll", now)
+
+    def _clamp(self, interval):
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def due(self, now):
+        """(name, url) of the feeds whose next poll time has come, in RSS_FEEDS order."""
+        return [(name, url) for name, url in self.feeds.items() if self.state[url]["next_poll"] <= now]
+
+    def seconds_until_next(self, now):
+        return max(0.0, min(self.state[url]["next_poll"] for url in self.feeds.values()) - now)
+
+    def record(self, url, changed, now):
+        """Schedule the next poll of a feed after a poll that did or did not find new articles."""
+        entry = self.state[url]
+        if changed:
+            last_change = entry.get("last_change")
+            if last_change:
+                gap = now - last_change
+                average = entry.get("average_gap")
+                entry["average_gap"] = gap if average is None else (1 - CHANGE_GAP_WEIGHT) * average + CHANGE_GAP_WEIGHT * gap
+                entry["interval"] = self._clamp(entry["average_gap"] / 2)
+            else:
+                entry["interval"] = self._clamp(entry["interval"] / 2)
+            entry["last_change"] = now
+        else:
+            entry["interval"] = self._clamp(entry["interval"] * BACKOFF_FACTOR)
+        entry["next_poll"] = now + entry["interval"]
+
+    def save(self):
+        if self.path:
+            save_feed_state(self.path, self.state)
+
+
+def run_daemon(on_batch, workers=MAX_WORKERS, max_per_host=MAX_PER_HOST, retries=RETRY_TOTAL, backoff=RETRY_BACKOFF,
+               feed_state_file=FEED_STATE_FILE, database_file=DATABASE_FILE, max_entries=MAX_ENTRIES_PER_FEED,
+               cache_dir=DEFAULT_CACHE_DIR, extractor=DEFAULT_EXTRACTOR, source_budget=None,
+               schedule_file=SCHEDULE_FILE, min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL,
+               max_polls=None):
+    """
+    Poll the feeds forever, each on its FeedSchedule interval, and hand every
+    batch of new articles to on_batch(csv_rows, json_articles) as it arrives.
+    Sessions, the response cache and the database URL index stay open between
+    polls. Every new entry of a feed is collected, newest first, up to the
+    first known URL. After each batch the URL index is reloaded, so articles
+    that did not reach the database - all of them when on_batch raises, the
+    failed ones when it only merged part of the batch - stay pending in the
+    feed state and are fetched (from the response cache) again on the next
+    poll of their feed. Such retries do not count as changes of the feed.
+    max_polls stops after that many polling rounds, for testing.
+    """
+    global TODAY_DATE
+    limiter = RequestLimiter(max(workers, 1), max_per_host)
+    sessions = SessionPool(retries=retries, backoff=backoff, pool_size=max_per_host)
+    feed_state = load_feed_state(feed_state_file) if feed_state_file else None
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    schedule = FeedSchedule(schedule_file, RSS_FEEDS, min_interval, max_interval)
+    feed_options = dict(limiter=limiter, sessions=sessions, feed_state=feed_state,
+                        known_urls=load_known_urls(database_file), all_entries=True,
+                        max_entries=max_entries, cache=cache, extractor=extractor)
+    print(f"Polling {len(RSS_FEEDS)} feeds every {min_interval}-{max_interval}s; press Ctrl+C to stop.")
+    polls = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            while max_polls is None or polls < max_polls:
+                time.sleep(schedule.seconds_until_next(time.time()))
+                # Articles are dated by the day they are collected
+                TODAY_DATE = today_iso()
+                due = schedule.due(time.time())
+                retrying = {url: set(feed_state.get(url, {}).get("pending", ())) if feed_state is not None else set()
+                            for _, url in due}
+                futures = [executor.submit(process_feed, name, url, **feed_options) for name, url in due]
+                csv_rows = []
+                json_articles = []
+                for (name, url), future in zip(due, futures):
+                    feed_rows, feed_articles = future.result()
+                    changed = any(row[1] not in retrying[url] for row in feed_rows)
+                    schedule.record(url, changed, time.time())
+                    csv_rows.extend(feed_rows)
+                    json_articles.extend(feed_articles)
+                polls += 1
+                if csv_rows:
+                    if source_budget is not None:
+                        trim_articles(json_articles, source_budget or None)
+                    log(f"{len(csv_rows)} new articles from {len(due)} polled feeds")
+                    try:
+                        on_batch(csv_rows, json_articles)
+                    except Exception as e:
+                        log(f"Error processing new articles: {e}")
+                        metrics.error("batch", str(e), articles=len(json_articles))
+                    # Collected URLs were added in memory; only the merged ones are known
+                    feed_options["known_urls"].close()
+                    feed_options["known_urls"] = load_known_urls(database_file)
+                if feed_state_file:
+                    save_feed_state(feed_state_file, feed_state)
+                schedule.save()
+                metrics.flush()
+    except KeyboardInterrupt:
+        print("\nStopping.")
+    finally:
+        sessions.close()
+        if cache:
+            cache.close()
+        feed_options["known_urls"].close()
+        schedule.save()
+
+
+def report_timings(sessions, timings_file=None):
+    """Print per-host fetch timings and optionally save every request's timing as JSON."""
+    print("\nFetch timings per host:")
+    for host, stats in sessions.timing_summary().items():
+        reused = stats["reused_avg_seconds"]
+        reused_info = f", reused avg {reused:.3f}s" if reused is not None else ""
+        print(f"  - {host}: {stats['requests']} requests, first {stats['first_seconds']:.3f}s{reused_info}")
+
+    if timings_file:
+        try:
+            with open(timings_file, 'w', encoding='utf-8') as f:
+                json.dump({"summary": sessions.timing_summary(), "requests": sessions.timings}, f, indent=2)
+            print(f"Timings written to {timings_file}")
+        except IOError as e:
+            print(f"Error writing timings file: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect the latest articles from the configured RSS feeds")
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=1,
+        help='Number of feeds fetched concurrently; also caps in-flight requests (default: 1, sequential)'
+    )
+    parser.add_argument(
+        '--max-per-host',
+        type=int,
+        default=MAX_PER_HOST,
+        help=f'Maximum in-flight requests per host (default: {MAX_PER_HOST})'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=RETRY_TOTAL,
+        help=f'Retries for connection errors and 429/5xx responses; Retry-After is honoured (default: {RETRY_TOTAL})'
+    )
+    parser.add_argument(
+        '--backoff',
+        type=float,
+        default=RETRY_BACKOFF,
+        help=f'Exponential backoff factor in seconds between retries (default: {RETRY_BACKOFF})'
+    )
+    parser.add_argument(
+        '--timings',
+        metavar='FILE',
+        help='Write per-request fetch timings to this JSON file'
+    )
+    parser.add_argument(
+        '--feed-state',
+        default=FEED_STATE_FILE,
+        help=f'File storing ETag/Last-Modified per feed for conditional requests (default: {FEED_STATE_FILE})'
+    )
+    parser.add_argument(
+        '--no-conditional',
+        action='store_true',
+        help='Always download every feed in full, ignoring the saved feed state'
+    )
+    parser.add_argument(
+        '--database',
+        default=DATABASE_FILE,
+        help=f'Database CSV whose URLs are never downloaded again (default: {DATABASE_FILE})'
+    )
+    parser.add_argument(
+        '--all-entries',
+        action='store_true',
+        help='Collect every new entry of each feed, newest first, up to the first URL already in the database'
+    )
+    parser.add_argument(
+        '--max-entries',
+        type=int,
+        default=MAX_ENTRIES_PER_FEED,
+        help=f'Maximum entries per feed with --all-entries, 0 for no limit (default: {MAX_ENTRIES_PER_FEED})'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Directory of the compressed article page cache (default: {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the article page cache'
+    )
+    parser.add_argument(
+        '--extractor',
+        choices=EXTRACTOR_BACKENDS,
+        default=DEFAULT_EXTRACTOR,
+        help=f'Article text extraction backend (default: {DEFAULT_EXTRACTOR})'
+    )
+    parser.add_argument(
+        '--trim-source',
+        action='store_true',
+        help='Remove boilerplate lines from article texts and cut them to --source-budget tokens'
+    )
+    parser.add_argument(
+        '--source-budget',
+        type=int,
+        default=DEFAULT_SOURCE_BUDGET,
+        help=f'Estimated token budget per article with --trim-source, 0 for no limit (default: {DEFAULT_SOURCE_BUDGET})'
+    )
+    parser.add_argument(
+        '--trim-report',
+        metavar='FILE',
+        help='With --trim-source, write per-article sizes before and after to this JSON file'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Keep running: poll each feed on an adaptive interval and summarize, merge and render new articles as they arrive'
+    )
+    parser.add_argument(
+        '--min-interval',
+        type=int,
+        default=MIN_POLL_INTERVAL,
+        help=f'Shortest polling interval per feed in seconds with --daemon (default: {MIN_POLL_INTERVAL})'
+    )
+    parser.add_argument(
+        '--max-interval',
+        type=int,
+        default=MAX_POLL_INTERVAL,
+        help=f'Longest polling interval per feed in seconds with --daemon (default: {MAX_POLL_INTERVAL})'
+    )
+    parser.add_argument(
+        '--schedule',
+        default=SCHEDULE_FILE,
+        help=f'File storing the polling intervals with --daemon (default: {SCHEDULE_FILE})'
+    )
+    parser.add_argument(
+        '--summarizer',
+        choices=SUMMARIZER_BACKENDS,
+        default='gemini',
+        help='Summarization backend for new articles with --daemon (default: gemini)'
+    )
+    parser.add_argument(
+        '--near-dup',
+        choices=NEAR_DUP_MODES,
+        help='With --daemon, skip or link new articles that are near duplicates of archived ones'
+    )
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=10,
+        help='Number of recent articles rendered to output/articles.html with --daemon (default: 10)'
+    )
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics("collector", args)
+    install_profiling("collector", args, (sys.modules[__name__], PROFILE_TARGETS))
+    if args.max_per_host < 1:
+        parser.error("--max-per-host must be at least 1")
+    if args.daemon:
+        if args.min_interval < 1 or args.max_interval < args.min_interval:
+            parser.error("--min-interval must be at least 1 and not above --max-interval")
+        # Imported here: pipeline.py imports this module
+        from pipeline import close_warm, parse_options, process_batch, profile_targets
+        install_profiling("collector", args, *profile_targets())
+        stage_options = parse_options(
+            ['--summarizer', args.summarizer, '--database', args.database, '--size', str(args.size)]
+            + (['--near-dup', args.near_dup] if args.near_dup else []))
+        warm = {}
+
+        def on_batch(csv_rows, json_articles):
+            try:
+                process_batch(csv_rows, json_articles, stage_options, warm)
+            except Exception:
+                close_warm(warm)
+                raise
+
+        try:
+            run_daemon(
+                on_batch,
+                workers=args.workers,
+                max_per_host=args.max_per_host,
+                retries=args.retries,
+                backoff=args.backoff,
+                feed_state_file=None if args.no_conditional else args.feed_state,
+                database_file=args.database,
+                max_entries=args.max_entries,
+                cache_dir=None if args.no_cache else args.cache_dir,
+                extractor=args.extractor,
+                source_budget=args.source_budget if args.trim_source else None,
+                schedule_file=args.schedule,
+                min_interval=args.min_interval,
+                max_interval=args.max_interval,
+            )
+        finally:
+            close_warm(warm)
+        return
+    process_feeds(
+        workers=args.workers,
+        max_per_host=args.max_per_host,
+        retries=args.retries,
+        backoff=args.backoff,
+        timings_file=args.timings,
+        feed_state_file=None if args.no_conditional else args.feed_state,
+        database_file=args.database,
+        all_entries=args.all_entries,
+        max_entries=args.max_entries,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        extractor=args.extractor,
+        source_budget=args.source_budget if args.trim_source else None,
+        trim_report_file=args.trim_report,
+    )
+
+
 if __name__ == "__main__":
-    process_feeds()
\ No newline at end of file
+    main()
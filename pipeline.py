@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline runner.
+Runs collect -> summarize -> merge -> render in one process, the same steps
+as `make all`, handing records from one stage to the next in memory. Each
+stage still leaves the daily file it produced behind (database-today.csv,
+contents-today.temp.json, contents-today.json) as a checkpoint, so the
+Makefile steps keep working and --resume can pick a failed run up at the
+stage that failed. Completed stages and their timings are recorded in
+pipeline-state.json.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+import json_to_html
+import merge
+import news_collector
+from json_records import iter_records, write_records
+from json_to_html import iter_html, iter_json_file, select_articles, write_html_file
+from merge import load_csv_data, merge_contents_records, merge_database_rows
+from metrics import add_arguments as add_metrics_arguments, configure_from_args as configure_metrics, metrics
+from near_dup import MODES as NEAR_DUP_MODES, open_near_dup_index
+from news_collector import CSV_OUTPUT_FILE, JSON_OUTPUT_FILE, collect_articles, write_daily_files
+from profiling import add_arguments as add_profile_arguments, install_from_args as install_profiling
+from summarizer import (BACKENDS, DEFAULT_ENDPOINT, DEFAULT_PROMPT_FILE, DEFAULT_WORKERS, make_backend,
+                        remove_rows, summarize_articles, summarized_records)
+from summary_cache import DEFAULT_CACHE_FILE, DEFAULT_MODEL, OUTPUT_FILE, SummaryCache, read_prompt
+from url_index import normalize_url
+
+STAGES = ("collect", "summarize", "merge", "render")
+STATE_FILE = "pipeline-state.json"
+DATABASE_FILE = "database.csv"
+CONTENTS_FILE = "contents.json"
+HTML_FILE = os.path.join("output", "articles.html")
+DEFAULT_SIZE = 10
+DEFAULT_FEED_WORKERS = 6
+CSV_FIELDS = ('date', 'URL', 'topic')
+
+
+def profile_targets() -> List:
+    """The modules and hot functions --profile wraps, including the names imported here."""
+    return [
+        (news_collector, news_collector.PROFILE_TARGETS),
+        (merge, merge.PROFILE_TARGETS),
+        (json_to_html, json_to_html.PROFILE_TARGETS),
+        (sys.modules[__name__], ("load_csv_data", "select_articles", "iter_html")),
+    ]
+
+
+def load_state(state_file: str) -> Dict:
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {"completed": [], "timings": {}}
+
+
+def save_state(state_file: str, state: Dict) -> None:
+    temp_path = state_file + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, state_file)
+
+
+def run_collect(records: Dict, args) -> None:
+    csv_rows, articles = collect_articles(
+        workers=args.workers,
+        database_file=args.database,
+        source_budget=args.trim,
+    )
+    write_daily_files(csv_rows, articles)
+    records["rows"] = [dict(zip(CSV_FIELDS, row)) for row in csv_rows]
+    records["articles"] = articles
+
+
+def run_summarize(records: Dict, args) -> None:
+    if "articles" not in records:
+        records["articles"] = list(iter_records(JSON_OUTPUT_FILE))
+    articles = records["articles"]
+    # A long-running caller passes its backend in to keep the connection warm
+    backend = records.get("backend") or make_backend(args.summarizer, args.model, args.endpoint)
+    prompt = read_prompt(args.prompt)
+    cache = SummaryCache(args.cache)
+    try:
+        _, failed = summarize_articles(articles, backend, cache, prompt, args.summary_workers)
+        summaries = list(summarized_records(articles, cache, prompt, backend.model))
+    finally:
+        cache.close()
+        if backend is not records.get("backend"):
+            backend.close()
+    write_records(OUTPUT_FILE, summaries, indent=4)
+    records["summaries"] = summaries
+    print(f"Wrote {len(summaries)} summarized articles to {OUTPUT_FILE}")
+    if failed:
+        if not summaries:
+            raise RuntimeError(f"none of the {len(failed)} articles could be summarized")
+        # Left out of database.csv, so the next collection fetches them again
+        urls = [article.get('URL', '') for article in failed]
+        remove_rows(CSV_OUTPUT_FILE, urls)
+        if "rows" in records:
+            drop = {normalize_url(url) for url in urls}
+            records["rows"] = [row for row in records["rows"] if normalize_url(row['URL']) not in drop]
+        print(f"{len(failed)} articles could not be summarized and are left for the next collection:")
+        for url in urls:
+            print(f"  - {url}")
+
+
+def run_merge(records: Dict, args) -> None:
+    # Contents go first: database.csv is what marks a URL as collected, so a
+    # failure in between leaves the articles to be collected again, and both
+    # merges skip entries already present when the stage is resumed
+    rows = records.get("rows")
+    if rows is None:
+        rows = load_csv_data(CSV_OUTPUT_FILE)
+    summaries = records.get("summaries")
+    if summaries is None:
+        summaries = list(iter_records(OUTPUT_FILE))
+    print(f"Merging {len(summaries)} articles into {args.contents}")
+    skipped = []
+    content_added = merge_contents_records(summaries, args.contents, near_dup=args.near_dup,
+                                           dup_index=records.get("dup_index"), skipped=skipped)
+    print(f"Merging {len(rows)} database rows into {args.database}")
+    db_added = merge_database_rows(rows, args.database, skip_urls=skipped)
+    print(f"Merge added {db_added} database rows and {content_added} articles")
+
+
+def run_render(records: Dict, args) -> None:
+    articles = select_articles(iter_json_file(args.contents), args.size)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    write_html_file(iter_html(articles, args.size), args.output)
+
+
+STAGE_FUNCTIONS = {
+    "collect": run_collect,
+    "summarize": run_summarize,
+    "merge": run_merge,
+    "render": run_render,
+}
+
+
+def run_pipeline(args) -> bool:
+    """Run the stages in order, skipping completed ones when resuming. Returns True on success."""
+    state = load_state(args.state) if args.resume else {"completed": [], "timings": {}}
+    done: List[str] = state["completed"]
+    if args.resume and done:
+        print(f"Resuming; already completed: {', '.join(done)}")
+        if len(done) == len(STAGES):
+            print("The last run completed; nothing to resume.")
+
+    records: Dict = {}
+    ok = True
+    for stage in STAGES:
+        if stage in done:
+            continue
+        print(f"\n=== {stage} ===")
+        start = time.perf_counter()
+        try:
+            STAGE_FUNCTIONS[stage](records, args)
+        except Exception as e:
+            state["timings"][stage] = round(time.perf_counter() - start, 3)
+            metrics.observe("stage", time.perf_counter() - start, {"stage": stage}, outcome="error")
+            metrics.error(stage, str(e))
+            print(f"Error: stage '{stage}' failed: {e}")
+            print(f"Fix the problem and run again with --resume to continue from {stage}.")
+            ok = False
+            break
+        state["timings"][stage] = round(time.perf_counter() - start, 3)
+        metrics.observe("stage", time.perf_counter() - start, {"stage": stage}, outcome="ok")
+        done.append(stage)
+        save_state(args.state, state)
+    save_state(args.state, state)
+
+    print("\nStage timings:")
+    for stage in STAGES:
+        if stage in state["timings"]:
+            status = "done" if stage in done else "failed"
+            print(f"  - {stage:<10} {state['timings'][stage]:8.2f}s  {status}")
+    print(f"  - {'total':<10} {sum(state['timings'].values()):8.2f}s")
+    return ok
+
+
+def process_batch(csv_rows: List[List[str]], articles: List[Dict], args, warm: Dict) -> None:
+    """
+    Summarize, merge and render one batch of freshly collected articles, as
+    the collector's daemon mode does whenever new articles arrive. warm holds
+    the model backend and near-duplicate index kept open between batches;
+    release it with close_warm(), also after a failed batch.
+    """
+    if "backend" not in warm:
+        warm["backend"] = make_backend(args.summarizer, args.model, args.endpoint)
+    if args.near_dup:
+        dup_index = warm.get("dup_index")
+        if dup_index is None or not dup_index.is_current():
+            warm["dup_index"] = open_near_dup_index(args.contents)
+    records = dict(warm, rows=[dict(zip(CSV_FIELDS, row)) for row in csv_rows], articles=articles)
+    timings = []
+    for stage in STAGES[1:]:
+        start = time.perf_counter()
+        STAGE_FUNCTIONS[stage](records, args)
+        metrics.observe("stage", time.perf_counter() - start, {"stage": stage}, outcome="ok")
+        timings.append(f"{stage} {time.perf_counter() - start:.2f}s")
+    print(f"Batch of {len(articles)} articles done: {', '.join(timings)}")
+
+
+def close_warm(warm: Dict) -> None:
+    backend = warm.pop("backend", None)
+    if backend is not None:
+        backend.close()
+    warm.clear()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Run collect, summarize, merge and render in one process",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python pipeline.py
+  python pipeline.py --summarizer fake --size 20
+  python pipeline.py --resume
+  python pipeline.py --workers 8 --trim 3000 --near-dup skip
+        """
+    )
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip the stages the last run completed and continue from the one that failed')
+    parser.add_argument('--state', default=STATE_FILE, help=f'Pipeline state file (default: {STATE_FILE})')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_FEED_WORKERS,
+                        help=f'Feeds collected concurrently (default: {DEFAULT_FEED_WORKERS})')
+    parser.add_argument('--trim', type=int, metavar='TOKENS',
+                        help='Strip boilerplate from article texts and cut them to this token budget, 0 for no limit')
+    parser.add_argument('--summarizer', choices=BACKENDS, default='gemini',
+                        help='Summarization backend (default: gemini)')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Gemini model name (default: {DEFAULT_MODEL})')
+    parser.add_argument('--endpoint', default=os.environ.get("GEMINI_ENDPOINT", DEFAULT_ENDPOINT),
+                        help='Gemini API base URL (default: $GEMINI_ENDPOINT or the public API)')
+    parser.add_argument('--prompt', default=DEFAULT_PROMPT_FILE,
+                        help=f'Summarization prompt (default: {DEFAULT_PROMPT_FILE})')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_FILE, help=f'Summary cache file (default: {DEFAULT_CACHE_FILE})')
+    parser.add_argument('--summary-workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Summarization batches in flight at once (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--near-dup', choices=NEAR_DUP_MODES,
+                        help='Skip or link new articles that are near duplicates of archived ones')
+    parser.add_argument('--database', default=DATABASE_FILE, help=f'Database CSV (default: {DATABASE_FILE})')
+    parser.add_argument('--contents', default=CONTENTS_FILE,
+                        help=f'Contents JSON (.json array or .jsonl) file (default: {CONTENTS_FILE})')
+    parser.add_argument('--output', '-o', default=HTML_FILE, help=f'HTML output file (default: {HTML_FILE})')
+    parser.add_argument('--size', '-s', type=int, default=DEFAULT_SIZE,
+                        help=f'Number of recent articles to render, 0 for all (default: {DEFAULT_SIZE})')
+    add_metrics_arguments(parser)
+    add_profile_arguments(parser)
+    return parser
+
+
+def parse_options(argv: Optional[List[str]] = None):
+    """Parse pipeline options; the collector's daemon mode builds its stage options here too."""
+    args = build_parser().parse_args(argv)
+    args.size = args.size or None
+    return args
+
+
+def main():
+    args = parse_options()
+    configure_metrics("pipeline", args)
+    install_profiling("pipeline", args, *profile_targets())
+
+    if not os.path.exists(args.prompt):
+        print(f"Error: File '{args.prompt}' not found.")
+        sys.exit(1)
+
+    if not run_pipeline(args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Opt-in cProfile hooks for the hot paths of the collector, merge and render
+scripts. Each script names its hot functions in PROFILE_TARGETS; with
+--profile DIR those module attributes are replaced by profiled wrappers, so
+nothing is wrapped and nothing costs anything when the option is off.
+
+Every target accumulates into its own profile. At exit the run writes to
+DIR/<job>-<YYYYmmdd-HHMMSS>-<pid>/:
+  <function>.prof  - pstats data, e.g. for `python -m pstats` or snakeviz
+  summary.txt      - calls and time per function, and the top functions
+                     by cumulative time under each of them
+Only one profiler can be active at a time, so profiled calls from worker
+threads take turns; the profiled code is CPU-bound and mostly serialized by
+the GIL anyway. A target called from inside another one is counted in the
+outer profile.
+
+`python profiling.py DIR` prints the summary of a profile directory again.
+"""
+
+import argparse
+import atexit
+import cProfile
+import functools
+import inspect
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+TOP_FUNCTIONS = 25
+SUMMARY_FILE = "summary.txt"
+
+
+class Profiler:
+    """Per-function cProfile accumulators, written to one directory per run."""
+
+    def __init__(self):
+        self.enabled = False
+        self.directory: Optional[str] = None
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._calls: Dict[str, int] = {}
+        self._seconds: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._running = False
+
+    def configure(self, job: str, directory: str) -> None:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        self.directory = os.path.join(directory, f"{job}-{stamp}-{os.getpid()}")
+        self.enabled = True
+
+    def _call(self, name: str, func: Callable, args, kwargs, counted: bool = True):
+        with self._lock:
+            if counted:
+                self._calls[name] = self._calls.get(name, 0) + 1
+            if self._running:
+                return func(*args, **kwargs)
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = cProfile.Profile()
+            self._running = True
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+                self._seconds[name] = self._seconds.get(name, 0.0) + time.perf_counter() - start
+                self._running = False
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """A profiled stand-in for func; generators are profiled while they are iterated."""
+        if inspect.isgeneratorfunction(func):
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                generator = self._call(name, func, args, kwargs)
+                while True:
+                    try:
+                        value = self._call(name, next, (generator,), {}, counted=False)
+                    except StopIteration:
+                        return
+                    yield value
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self._call(name, func, args, kwargs)
+        return wrapper
+
+    def install(self, module, names: Iterable[str]) -> None:
+        """Replace module.<name> with a profiled wrapper for each name."""
+        for name in names:
+            func = getattr(module, name)
+            if not getattr(func, '__wrapped__', None):
+                setattr(module, name, self.wrap(name, func))
+
+    def summary(self, top: int = TOP_FUNCTIONS) -> str:
+        out = io.StringIO()
+        out.write(f"{'function':<28} {'calls':>7} {'seconds':>10}\n")
+        for name in sorted(self._profiles, key=lambda name: -self._seconds.get(name, 0.0)):
+            out.write(f"{name:<28} {self._calls.get(name, 0):>7} {self._seconds.get(name, 0.0):>10.3f}\n")
+        for name in sorted(self._profiles, key=lambda name: -self._seconds.get(name, 0.0)):
+            out.write(f"\n=== {name} ===\n")
+            stats = pstats.Stats(self._profiles[name], stream=out)
+            stats.strip_dirs().sort_stats('cumulative').print_stats(top)
+        return out.getvalue()
+
+    def write(self) -> None:
+        """Dump every profile and the summary into the run directory."""
+        if not self.enabled or not self._profiles:
+            return
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            for name, profile in self._profiles.items():
+                profile.dump_stats(os.path.join(self.directory, name + '.prof'))
+            with open(os.path.join(self.directory, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+                f.write(self.summary())
+        print(f"Profiles written to {self.directory}")
+        for name in sorted(self._profiles, key=lambda name: -self._seconds.get(name, 0.0)):
+            print(f"  - {name}: {self._calls.get(name, 0)} calls, {self._seconds.get(name, 0.0):.3f}s")
+
+
+profiler = Profiler()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """The --profile option shared by the scripts."""
+    parser.add_argument('--profile', metavar='DIR',
+                        help='Profile the hot functions with cProfile and write the results to a new directory in DIR')
+
+
+def install_from_args(job: str, args, *targets) -> None:
+    """
+    With --profile, wrap the (module, names) targets and write the profiles
+    when the process exits. Without it, nothing is touched.
+    """
+    if not args.profile:
+        return
+    if not profiler.enabled:
+        profiler.configure(job, args.profile)
+        atexit.register(profiler.write)
+    for module, names in targets:
+        profiler.install(module, names)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Print the summary of a profile directory",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python merge.py --profile profiles
+  python profiling.py profiles/merge-20250101-073000-4242
+  python profiling.py profiles/merge-20250101-073000-4242 --function load_json_data --top 40
+        """
+    )
+    parser.add_argument('directory', help='Run directory written with --profile')
+    parser.add_argument('--function', help='Show the full profile of this function instead of the summary')
+    parser.add_argument('--top', type=int, default=TOP_FUNCTIONS,
+                        help=f'Functions to list (default: {TOP_FUNCTIONS})')
+    parser.add_argument('--sort', default='cumulative', help='pstats sort key (default: cumulative)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory '{args.directory}' not found.")
+        sys.exit(1)
+
+    if not args.function:
+        summary_path = os.path.join(args.directory, SUMMARY_FILE)
+        if not os.path.exists(summary_path):
+            print(f"Error: File '{summary_path}' not found.")
+            sys.exit(1)
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            print(f.read(), end='')
+        return
+
+    profile_path = os.path.join(args.directory, args.function + '.prof')
+    if not os.path.exists(profile_path):
+        print(f"Error: File '{profile_path}' not found.")
+        sys.exit(1)
+    pstats.Stats(profile_path).strip_dirs().sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    main()
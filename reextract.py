@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Batch re-extraction of article text from saved HTML.
+Reads the URLs from the database CSV, looks their pages up in the response
+cache or an HTML directory, and runs the extractor over a process pool.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from extractors import BACKENDS, DEFAULT_BACKEND, extract_text, page_filename, read_page
+from json_records import write_records
+from response_cache import DEFAULT_CACHE_DIR, ResponseCache
+
+
+def load_database_rows(file_path):
+    """Load the database CSV rows in file order."""
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        return [row for row in csv.DictReader(f) if row.get('URL')]
+
+
+def find_pages(rows, cache_dir=None, html_dir=None):
+    """
+    Resolve each row to a saved page path.
+    Returns (jobs, missing) where jobs is a list of (row, path).
+    """
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    jobs = []
+    missing = 0
+    for row in rows:
+        path = None
+        if cache:
+            path = cache.path_for(row['URL'])
+        if not path and html_dir:
+            for candidate in (page_filename(row['URL']), page_filename(row['URL']) + '.gz'):
+                if os.path.exists(os.path.join(html_dir, candidate)):
+                    path = os.path.join(html_dir, candidate)
+                    break
+        if path and os.path.exists(path):
+            jobs.append((row, path))
+        else:
+            missing += 1
+    if cache:
+        cache.close()
+    return jobs, missing
+
+
+def _extract_job(job):
+    """Worker: read one page from disk and extract its text."""
+    row, path, backend = job
+    try:
+        return row, extract_text(read_page(path), backend), None
+    except Exception as e:
+        return row, None, str(e)
+
+
+def reextract(jobs, output_file, workers=None, backend=DEFAULT_BACKEND, chunksize=8):
+    """
+    Extract every job over a process pool and stream the records to output_file
+    (a .json array or .jsonl file), in database order.
+    Returns (written, failed, seconds).
+    """
+    failed = 0
+    start = time.perf_counter()
+
+    def records(pool):
+        nonlocal failed
+        results = pool.imap(_extract_job, [(row, path, backend) for row, path in jobs], chunksize=chunksize)
+        for row, source_text, error in results:
+            if error is not None:
+                print(f"Error extracting {row['URL']}: {error}")
+                failed += 1
+                continue
+            yield {
+                "date": row.get('date', ''),
+                "topic": row.get('topic', ''),
+                "URL": row['URL'],
+                "source": source_text,
+            }
+
+    with Pool(processes=workers) as pool:
+        written = write_records(output_file, records(pool), indent=4)
+    return written, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-extract article text from cached HTML over all CPU cores",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python reextract.py
+  python reextract.py --backend strainer --workers 8 --output contents-reextracted.json
+  python reextract.py --html-dir pages/ --no-cache
+        """
+    )
+    parser.add_argument(
+        '--database',
+        default='database.csv',
+        help='Database CSV listing the URLs to re-extract (default: database.csv)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Response cache to read pages from (default: {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not look pages up in the response cache'
+    )
+    parser.add_argument(
+        '--html-dir',
+        help='Directory of saved pages named by extractors.page_filename(url)'
+    )
+    parser.add_argument(
+        '--output', '-o',
+        default='contents-reextracted.json',
+        help='Output .json or .jsonl file (default: contents-reextracted.json)'
+    )
+    parser.add_argument(
+        '--backend', '-b',
+        choices=BACKENDS,
+        default=DEFAULT_BACKEND,
+        help=f'Extractor backend (default: {DEFAULT_BACKEND})'
+    )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of worker processes (default: number of CPUs)'
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        print(f"Error: File '{args.database}' not found.")
+        sys.exit(1)
+    cache_dir = None if args.no_cache else args.cache_dir
+    if cache_dir and not os.path.isdir(cache_dir):
+        cache_dir = None
+    if not cache_dir and not args.html_dir:
+        print("Error: No page source available; use --cache-dir or --html-dir.")
+        sys.exit(1)
+
+    rows = load_database_rows(args.database)
+    jobs, missing = find_pages(rows, cache_dir, args.html_dir)
+    print(f"Found {len(jobs)} saved pages for {len(rows)} URLs ({missing} missing)")
+
+    written, failed, seconds = reextract(jobs, args.output, args.workers, args.backend)
+    rate = written / seconds if seconds > 0 else 0.0
+    print(f"Extracted {written} pages ({failed} failed) in {seconds:.2f}s "
+          f"with {args.workers} workers: {rate:.1f} pages/sec")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
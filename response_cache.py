@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for downloaded article pages.
+Bodies are stored gzip-compressed under the SHA-256 of their content; an
+append-only journal maps each URL to its content hash.
+By default entries never expire, so the whole history can be re-extracted
+offline (see reextract.py); only the size limit evicts, least recently used
+first. A TTL can still be set for a cache that should only serve re-runs.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = "response-cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_TTL = None
+# An eviction frees space down to this share of max_bytes, so it runs in batches
+EVICT_TARGET = 0.9
+JOURNAL_FILE = "index.jsonl"
+
+
+class ResponseCache:
+    """
+    URL -> body cache with a total size limit, LRU eviction and an optional TTL.
+    Several URLs serving identical bytes share one compressed blob.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: Optional[float] = DEFAULT_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: Dict[str, Dict] = {}
+        self._references = Counter()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._journal_path = os.path.join(directory, JOURNAL_FILE)
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._load()
+        for entry in self.entries.values():
+            self._add_reference(entry)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+
+    def _load(self) -> None:
+        """Replay the journal; a torn last line from a crash is ignored."""
+        if not os.path.exists(self._journal_path):
+            return
+        with open(self._journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                url = record.get("url")
+                if record.get("op") == "del":
+                    self.entries.pop(url, None)
+                elif record.get("op") == "put":
+                    self.entries[url] = record["entry"]
+                elif record.get("op") == "touch" and url in self.entries:
+                    self.entries[url]["accessed"] = record["accessed"]
+
+    def _log(self, record: Dict) -> None:
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+
+    def blob_path(self, content_hash: str) -> str:
+        return os.path.join(self.directory, "objects", content_hash[:2], content_hash + ".gz")
+
+    def path_for(self, url: str) -> Optional[str]:
+        """Return the compressed blob path for a cached URL, or None."""
+        entry = self.entries.get(url)
+        return self.blob_path(entry["hash"]) if entry else None
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return self.ttl is not None and now - entry["stored"] > self.ttl
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Return the cached body for a URL, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self.entries.get(url)
+            now = time.time()
+            if not entry or self._expired(entry, now):
+                return None
+            try:
+                with gzip.open(self.blob_path(entry["hash"]), 'rb') as f:
+                    content = f.read()
+            except OSError:
+                self._remove(url)
+                return None
+            entry["accessed"] = now
+            self._log({"op": "touch", "url": url, "accessed": now})
+            return content
+
+    def put(self, url: str, content: bytes) -> str:
+        """Store a body for a URL and return its content hash."""
+        content_hash = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(content_hash)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = path + ".tmp"
+                with gzip.open(temp_path, 'wb') as f:
+                    f.write(content)
+                os.replace(temp_path, path)
+            now = time.time()
+            entry = {"hash": content_hash, "size": os.path.getsize(path), "stored": now, "accessed": now}
+            previous = self.entries.get(url)
+            self.entries[url] = entry
+            self._add_reference(entry)
+            if previous is not None and self._drop_reference(previous) and previous["hash"] != content_hash:
+                self._delete_blob(previous["hash"])
+            self._log({"op": "put", "url": url, "entry": entry})
+            if self._total > self.max_bytes:
+                self._evict(now)
+        return content_hash
+
+    def _add_reference(self, entry: Dict) -> None:
+        if not self._references[entry["hash"]]:
+            self._total += entry["size"]
+        self._references[entry["hash"]] += 1
+
+    def _drop_reference(self, entry: Dict) -> bool:
+        """Release one URL's reference to a blob; True when no URL refers to it any more."""
+        self._references[entry["hash"]] -= 1
+        if self._references[entry["hash"]] > 0:
+            return False
+        del self._references[entry["hash"]]
+        self._total -= entry["size"]
+        return True
+
+    def _evict(self, now: float) -> int:
+        """
+        Drop expired entries, then least recently used ones. Once over
+        max_bytes, entries go until the cache is down to EVICT_TARGET of it.
+        """
+        target = self.max_bytes * EVICT_TARGET if self._total > self.max_bytes else self.max_bytes
+        if self.ttl is None and self._total <= target:
+            return 0
+        removed = 0
+        for url in sorted(self.entries, key=lambda u: self.entries[u]["accessed"]):
+            if self._total <= target and not self._expired(self.entries[url], now):
+                if self.ttl is None:
+                    break
+                continue
+            self._remove(url)
+            removed += 1
+        return removed
+
+    def _remove(self, url: str) -> None:
+        entry = self.entries.pop(url, None)
+        self._log({"op": "del", "url": url})
+        if entry is not None and self._drop_reference(entry):
+            self._delete_blob(entry["hash"])
+
+    def _delete_blob(self, content_hash: str) -> None:
+        try:
+            os.remove(self.blob_path(content_hash))
+        except OSError:
+            pass
+
+    def _delete_orphans(self) -> None:
+        live = self._references
+        objects_dir = os.path.join(self.directory, "objects")
+        for prefix in os.listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if name.endswith(".gz") and name[:-3] not in live:
+                    os.remove(os.path.join(prefix_dir, name))
+
+    def prune(self) -> int:
+        """Apply TTL/size eviction now and compact the journal."""
+        with self._lock:
+            removed = self._evict(time.time())
+            self._delete_orphans()
+            self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        self._journal.close()
+        temp_path = self._journal_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for url, entry in self.entries.items():
+                f.write(json.dumps({"op": "put", "url": url, "entry": entry}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._journal_path)
+        self._journal = open(self._journal_path, 'a', encoding='utf-8')
+
+    def stats(self) -> Dict:
+        return {"urls": len(self.entries), "blobs": len(self._references), "bytes": self._total}
+
+    def close(self) -> None:
+        """Compact the journal and release the file handle."""
+        with self._lock:
+            self._compact()
+            self._journal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the article response cache")
+    parser.add_argument('command', choices=['stats', 'prune'], help='Action to perform')
+    parser.add_argument(
+        '--cache-dir',
+        default=DEFAULT_CACHE_DIR,
+        help=f'Cache directory (default: {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--max-bytes',
+        type=int,
+        default=DEFAULT_MAX_BYTES,
+        help=f'Total size limit of the compressed bodies (default: {DEFAULT_MAX_BYTES})'
+    )
+    parser.add_argument(
+        '--ttl',
+        type=float,
+        default=DEFAULT_TTL,
+        help='Seconds before an entry expires (default: never; only the size limit evicts)'
+    )
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.cache_dir):
+        print(f"Error: Cache directory '{args.cache_dir}' not found.")
+        sys.exit(1)
+
+    cache = ResponseCache(args.cache_dir, args.max_bytes, args.ttl)
+    if args.command == 'prune':
+        removed = cache.prune()
+        print(f"Removed {removed} entries")
+    stats = cache.stats()
+    print(f"{stats['urls']} URLs, {stats['blobs']} blobs, {stats['bytes']} bytes compressed")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Full-text search over the article archive.
+An inverted index over topic, summary and source is kept next to the
+contents file, in contents.json.search/:
+  docs.jsonl / docs.idx  - one line per article (URL, topic, date) and the
+                           8-byte offset of each line
+  docs.len               - weighted length of each article, 4 bytes each
+  seg-NNNNNN.post        - postings: per term, delta-encoded doc ids and
+                           term frequencies as varints
+  seg-NNNNNN.dict        - term -> [offset, byte length, document frequency]
+  meta.json              - segment list, totals and the contents file size
+Each merge writes one small segment; once there are more than MAX_SEGMENTS
+they are compacted into one. Hits are ranked with BM25.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from json_records import iter_records
+
+MAX_SEGMENTS = 8
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = (('topic', 3), ('summary', 2), ('source', 1))
+DEFAULT_LIMIT = 10
+TOKEN = re.compile(r'\w+')
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+""".split())
+OFFSET = struct.Struct('>Q')
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def term_frequencies(record: Dict) -> Tuple[Counter, int]:
+    """Weighted term counts of a record's fields, and the weighted document length."""
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        value = record.get(field)
+        if isinstance(value, str):
+            for token in tokenize(value):
+                counts[token] += weight
+    return counts, sum(counts.values())
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_postings(data: bytes) -> Iterator[Tuple[int, int]]:
+    """Yield (doc_id, term_frequency) pairs from a postings list."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+    doc_id = 0
+    for delta, frequency in zip(values[0::2], values[1::2]):
+        doc_id += delta
+        yield doc_id, frequency
+
+
+def encode_postings(postings: Iterable[Tuple[int, int]]) -> bytes:
+    out = bytearray()
+    previous = 0
+    for doc_id, frequency in postings:
+        encode_varint(doc_id - previous, out)
+        encode_varint(frequency, out)
+        previous = doc_id
+    return bytes(out)
+
+
+class SearchIndex:
+    """Segmented inverted index of a contents file."""
+
+    def __init__(self, data_file: str):
+        self.data_file = data_file
+        self.directory = data_file + '.search'
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.meta = {"data_size": 0, "segments": [], "next_segment": 1, "doc_count": 0, "total_length": 0}
+        self._dicts: Dict[str, Dict[str, List[int]]] = {}
+        self._pending_docs: List[Dict] = []
+        self._pending_lengths: List[int] = []
+        self._pending_postings = defaultdict(list)
+
+    @staticmethod
+    def exists(data_file: str) -> bool:
+        return os.path.exists(os.path.join(data_file + '.search', 'meta.json'))
+
+    @classmethod
+    def open(cls, data_file: str) -> 'SearchIndex':
+        """Open the index of data_file, rebuilding it when missing or stale."""
+        index = cls(data_file)
+        if not index._load():
+            if os.path.exists(data_file):
+                print(f"Building search index for {data_file}...")
+            index.rebuild(iter_records(data_file) if os.path.exists(data_file) else [])
+        return index
+
+    def _data_size(self) -> int:
+        return os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+
+    def _load(self) -> bool:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if meta.get("data_size") != self._data_size():
+            return False
+        self.meta = meta
+        return True
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def __len__(self) -> int:
+        return self.meta["doc_count"] + len(self._pending_docs)
+
+    # Writing
+
+    def add(self, records: Iterable[Dict]) -> int:
+        """Queue records for the next segment; returns how many were added."""
+        added = 0
+        for record in records:
+            counts, length = term_frequencies(record)
+            doc_id = len(self)
+            for term, frequency in counts.items():
+                self._pending_postings[term].append((doc_id, frequency))
+            self._pending_docs.append({
+                "URL": record.get('URL', ''),
+                "topic": record.get('topic', ''),
+                "date": record.get('date', ''),
+            })
+            self._pending_lengths.append(length)
+            added += 1
+        return added
+
+    def _write_segment(self, postings: Dict[str, List[Tuple[int, int]]]) -> str:
+        name = f"seg-{self.meta['next_segment']:06d}"
+        self.meta["next_segment"] += 1
+        dictionary = {}
+        with open(self._path(name + '.post'), 'wb') as f:
+            offset = 0
+            for term in sorted(postings):
+                data = encode_postings(postings[term])
+                f.write(data)
+                dictionary[term] = [offset, len(data), len(postings[term])]
+                offset += len(data)
+        with open(self._path(name + '.dict'), 'w', encoding='utf-8') as f:
+            json.dump(dictionary, f, ensure_ascii=False, separators=(',', ':'))
+        return name
+
+    def _append_docs(self) -> None:
+        with open(self._path('docs.jsonl'), 'ab') as docs, open(self._path('docs.idx'), 'ab') as offsets:
+            position = docs.tell()
+            for doc in self._pending_docs:
+                line = (json.dumps(doc, ensure_ascii=False) + "\n").encode('utf-8')
+                offsets.write(OFFSET.pack(position))
+                docs.write(line)
+                position += len(line)
+        with open(self._path('docs.len'), 'ab') as f:
+            array('I', self._pending_lengths).tofile(f)
+
+    def save(self) -> None:
+        """
+        Write queued records as a new segment and record the data file's
+        current size. Call it after the data file itself has been written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        if self._pending_docs:
+            self._append_docs()
+            if self._pending_postings:
+                self.meta["segments"].append(self._write_segment(self._pending_postings))
+            self.meta["doc_count"] += len(self._pending_docs)
+            self.meta["total_length"] += sum(self._pending_lengths)
+            self._pending_docs = []
+            self._pending_lengths = []
+            self._pending_postings = defaultdict(list)
+        if len(self.meta["segments"]) > MAX_SEGMENTS:
+            self.compact()
+        self.meta["data_size"] = self._data_size()
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def compact(self) -> None:
+        """Fold all segments into one."""
+        merged = defaultdict(list)
+        old_segments = list(self.meta["segments"])
+        # Later segments hold higher doc ids, so concatenating keeps postings sorted
+        for name in old_segments:
+            with open(self._path(name + '.post'), 'rb') as f:
+                data = f.read()
+            for term, (offset, length, _) in self._dictionary(name).items():
+                merged[term].extend(decode_postings(data[offset:offset + length]))
+        self.meta["segments"] = [self._write_segment(merged)] if merged else []
+        self._write_meta()
+        for name in old_segments:
+            for suffix in ('.post', '.dict'):
+                os.remove(self._path(name + suffix))
+        self._dicts = {}
+
+    def rebuild(self, records: Iterable[Dict]) -> None:
+        """Replace the index with one segment built from records."""
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                os.remove(self._path(name))
+        self.meta = {"data_size": 0, "segments": [], "next_segment": 1, "doc_count": 0, "total_length": 0}
+        self._pending_docs = []
+        self._pending_lengths = []
+        self._pending_postings = defaultdict(list)
+        self._dicts = {}
+        self.add(records)
+        self.save()
+
+    # Searching
+
+    def _dictionary(self, name: str) -> Dict[str, List[int]]:
+        if name not in self._dicts:
+            with open(self._path(name + '.dict'), 'r', encoding='utf-8') as f:
+                self._dicts[name] = json.load(f)
+        return self._dicts[name]
+
+    def _document(self, doc_id: int, docs, offsets) -> Dict:
+        offsets.seek(doc_id * OFFSET.size)
+        docs.seek(OFFSET.unpack(offsets.read(OFFSET.size))[0])
+        return json.loads(docs.readline())
+
+    def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Tuple[float, Dict]]:
+        """The best `limit` documents for a query as (score, doc) pairs, best first."""
+        terms = set(tokenize(query))
+        doc_count = self.meta["doc_count"]
+        if not terms or not doc_count:
+            return []
+        average_length = self.meta["total_length"] / doc_count
+
+        postings = defaultdict(list)
+        for name in self.meta["segments"]:
+            dictionary = self._dictionary(name)
+            entries = [(term, dictionary[term]) for term in terms if term in dictionary]
+            if not entries:
+                continue
+            with open(self._path(name + '.post'), 'rb') as f:
+                for term, (offset, length, _) in entries:
+                    f.seek(offset)
+                    postings[term].extend(decode_postings(f.read(length)))
+
+        lengths = array('I')
+        with open(self._path('docs.len'), 'rb') as f:
+            lengths.frombytes(f.read())
+        scores = defaultdict(float)
+        for term, term_postings in postings.items():
+            document_frequency = len(term_postings)
+            idf = math.log(1 + (doc_count - document_frequency + 0.5) / (document_frequency + 0.5))
+            for doc_id, frequency in term_postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        with open(self._path('docs.jsonl'), 'rb') as docs, open(self._path('docs.idx'), 'rb') as offsets:
+            return [(score, self._document(doc_id, docs, offsets)) for doc_id, score in best]
+
+
+def open_search_index(contents_file: str) -> Optional[SearchIndex]:
+    """The contents file's search index if one has been created, else None."""
+    return SearchIndex.open(contents_file) if SearchIndex.exists(contents_file) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search the article archive",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python search.py --rebuild
+  python search.py "apple ai answer engine"
+  python search.py -n 20 --contents contents.jsonl openai
+        """
+    )
+    parser.add_argument('query', nargs='*', help='Search terms')
+    parser.add_argument('--contents', default='contents.json', help='Archive contents file (default: contents.json)')
+    parser.add_argument('-n', '--limit', type=int, default=DEFAULT_LIMIT, help=f'Number of hits (default: {DEFAULT_LIMIT})')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild the index from the contents file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.contents):
+        print(f"Error: File '{args.contents}' not found.")
+        sys.exit(1)
+
+    if args.rebuild:
+        start = time.perf_counter()
+        index = SearchIndex(args.contents)
+        index.rebuild(iter_records(args.contents))
+        print(f"Indexed {len(index)} articles from {args.contents} in {time.perf_counter() - start:.2f}s")
+        if not args.query:
+            return
+    if not args.query:
+        parser.error("a query is required")
+
+    index = SearchIndex.open(args.contents)
+    start = time.perf_counter()
+    hits = index.search(' '.join(args.query), args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    for score, doc in hits:
+        print(f"{score:7.2f}  {doc['date']}  {doc['topic']}\n         {doc['URL']}")
+    print(f"{len(hits)} hits in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Per-article summarization stage.
+Reads contents-today.temp.json, sends the articles that are not in the
+summary cache to the model in token-budgeted batches over a bounded worker
+pool, and writes contents-today.json. Every result is stored in the summary
+cache as soon as it arrives, so a failed or interrupted run resumes where it
+stopped. Items a batch fails to return are retried one at a time.
+
+Articles that still fail are reported and their rows are removed from
+database-today.csv, so merge takes every summary that did arrive and the
+next collection picks the failed articles up again. The run only exits
+non-zero when nothing could be summarized.
+
+Backends:
+  gemini - the Gemini generateContent HTTP API; --endpoint points it at
+           another server, such as the fake server below
+  fake   - deterministic summaries computed locally, no network
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, Iterator, List
+
+import requests
+
+from json_records import iter_records, write_records
+from summary_cache import (DEFAULT_CACHE_FILE, DEFAULT_MODEL, INPUT_FILE, OUTPUT_FILE, SummaryCache,
+                           fake_summary, has_summary, read_prompt, summarized_record, summary_key)
+from text_budget import estimate_tokens
+from url_index import normalize_url
+
+DEFAULT_PROMPT_FILE = "batch-summary.prompt"
+DATABASE_INPUT_FILE = "database-today.csv"
+DEFAULT_ENDPOINT = "https://generativelanguage.googleapis.com"
+API_KEY_FILE = "gemini.key"
+BACKENDS = ("gemini", "fake")
+ARTICLES_MARKER = "\n\nArticles:\n"
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_TOKENS = 24000
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_REQUESTS_PER_MINUTE = 10
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 2.0
+REQUEST_TIMEOUT = 300
+FAKE_SERVER_PORT = 8766
+
+
+def build_prompt(prompt: str, batch: List[Dict]) -> str:
+    """The prompt file followed by the batch as a JSON array."""
+    articles = [{"URL": article.get('URL', ''), "topic": article.get('topic', ''), "source": article.get('source', '')}
+                for article in batch]
+    return prompt + ARTICLES_MARKER + json.dumps(articles, ensure_ascii=False, indent=2)
+
+
+def make_batches(articles: List[Dict], prompt: str, max_tokens: int = DEFAULT_BATCH_TOKENS,
+                 max_items: int = DEFAULT_BATCH_SIZE) -> List[List[Dict]]:
+    """
+    Group articles, in order, into batches whose prompt stays within
+    max_tokens and max_items. An article too long for any batch gets one
+    of its own.
+    """
+    budget = max_tokens - estimate_tokens(prompt)
+    batches = []
+    batch, used = [], 0
+    for article in articles:
+        cost = estimate_tokens(article.get('source', '')) + estimate_tokens(article.get('topic', '')) + 16
+        if batch and (used + cost > budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch, used = [], 0
+        batch.append(article)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def parse_response(text: str) -> List[Dict]:
+    """The JSON array in a model reply, tolerating a Markdown code fence around it."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise ValueError("Model reply is not a JSON array")
+    return [item for item in data if isinstance(item, dict)]
+
+
+def fake_reply(prompt_text: str) -> str:
+    """What the fake backend and fake server answer to a batch prompt."""
+    articles = json.loads(prompt_text.split(ARTICLES_MARKER, 1)[1])
+    return json.dumps([dict(URL=article["URL"], topic=article["topic"], **fake_summary(article))
+                       for article in articles if article.get('source')], ensure_ascii=False)
+
+
+class FakeBackend:
+    """Local stand-in for the model."""
+
+    model = "fake"
+
+    def complete(self, prompt_text: str) -> str:
+        return fake_reply(prompt_text)
+
+    def close(self) -> None:
+        pass
+
+
+class GeminiBackend:
+    """Gemini generateContent over HTTP; the endpoint can be overridden for tests."""
+
+    def __init__(self, model: str = DEFAULT_MODEL, api_key: str = "", endpoint: str = DEFAULT_ENDPOINT,
+                 timeout: float = REQUEST_TIMEOUT):
+        self.model = model
+        self.endpoint = endpoint.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"x-goog-api-key": api_key, "Content-Type": "application/json"})
+
+    def complete(self, prompt_text: str) -> str:
+        response = self.session.post(
+            f"{self.endpoint}/v1beta/models/{self.model}:generateContent",
+            json={
+                "contents": [{"parts": [{"text": prompt_text}]}],
+                "generationConfig": {"responseMimeType": "application/json"},
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        try:
+            return "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+        except (KeyError, IndexError, TypeError):
+            raise ValueError(f"Unexpected response from {self.endpoint}: {json.dumps(data)[:200]}")
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def read_api_key(key_file: str = API_KEY_FILE) -> str:
+    """GEMINI_API_KEY from the environment, else the contents of gemini.key."""
+    key = os.environ.get("GEMINI_API_KEY", "")
+    if not key and os.path.exists(key_file):
+        with open(key_file, 'r', encoding='utf-8') as f:
+            key = f.read().strip()
+    return key
+
+
+class RateLimiter:
+    """Space calls at least 60/per_minute seconds apart across all threads."""
+
+    def __init__(self, per_minute: float = DEFAULT_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def run_batch(backend, limiter: RateLimiter, prompt: str, batch: List[Dict], attempt: int = 0):
+    """
+    Summarize one batch. Returns (results, error) where results maps the
+    normalized URL of each returned article to its record.
+    """
+    if attempt:
+        time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+    limiter.wait()
+    try:
+        items = parse_response(backend.complete(build_prompt(prompt, batch)))
+    except Exception as e:
+        return {}, str(e)
+    results = {}
+    for item in items:
+        if has_summary(item):
+            results[normalize_url(item.get('URL', ''))] = item
+    if len(batch) == 1 and not results and len(items) == 1 and has_summary(items[0]):
+        # A single-article reply is unambiguous even when the model dropped the URL
+        results[normalize_url(batch[0].get('URL', ''))] = items[0]
+    return results, None
+
+
+def summarize_articles(articles: List[Dict], backend, cache: SummaryCache, prompt: str,
+                       workers: int = DEFAULT_WORKERS, max_tokens: int = DEFAULT_BATCH_TOKENS,
+                       max_items: int = DEFAULT_BATCH_SIZE, per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                       retries: int = DEFAULT_RETRIES):
+    """
+    Summarize every article with a source that is not cached yet, storing each
+    result in the cache as it arrives. An article missing from a batch reply
+    is retried on its own; one the model leaves out when asked alone counts
+    as skipped, like the prompt allows. Returns (summarized, failed) where
+    failed lists the articles that could not be summarized.
+    """
+    def key_of(article):
+        return summary_key(article['source'], prompt, backend.model)
+
+    pending = [article for article in articles if article.get('source') and not cache.get(key_of(article))]
+    if not pending:
+        return 0, []
+    batches = make_batches(pending, prompt, max_tokens, max_items)
+    print(f"Summarizing {len(pending)} articles in {len(batches)} batches with {workers} workers...")
+
+    limiter = RateLimiter(per_minute)
+    summarized = skipped = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        running = {executor.submit(run_batch, backend, limiter, prompt, batch): (batch, 0) for batch in batches}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch, attempt = running.pop(future)
+                results, error = future.result()
+                if error:
+                    print(f"Batch of {len(batch)} failed (attempt {attempt + 1}): {error}")
+                for article in batch:
+                    result = results.get(normalize_url(article.get('URL', '')))
+                    if result is not None:
+                        cache.put(key_of(article), result['summary'], result['questions'])
+                        summarized += 1
+                    elif error is None and len(batch) == 1:
+                        # Asked on its own and left out: the model judged the source too thin
+                        print(f"Skipped by the model: {article.get('URL', '')}")
+                        skipped += 1
+                    elif attempt < retries:
+                        retry = executor.submit(run_batch, backend, limiter, prompt, [article], attempt + 1)
+                        running[retry] = ([article], attempt + 1)
+                    else:
+                        print(f"Giving up on {article.get('URL', '')}")
+                        failed.append(article)
+            print(f"  {summarized} summarized, {skipped} skipped, {len(failed)} failed, "
+                  f"{len(running)} batches in flight")
+    return summarized, failed
+
+
+def summarized_records(articles: List[Dict], cache: SummaryCache, prompt: str, model: str) -> Iterator[Dict]:
+    """The summarized records of the articles that have a cached summary, in input order."""
+    for article in articles:
+        if not article.get('source'):
+            continue
+        cached = cache.get(summary_key(article['source'], prompt, model))
+        if cached:
+            yield summarized_record(article, cached)
+
+
+def remove_rows(csv_file: str, urls: Iterable[str]) -> int:
+    """
+    Drop the rows of the given URLs from a daily database CSV, so they are
+    not merged into database.csv and the collector fetches them again.
+    Returns the number of rows removed.
+    """
+    drop = {normalize_url(url) for url in urls}
+    if not drop or not os.path.exists(csv_file):
+        return 0
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return 0
+    header, body = rows[0], rows[1:]
+    url_column = header.index('URL') if 'URL' in header else 1
+    kept = [row for row in body if len(row) <= url_column or normalize_url(row[url_column]) not in drop]
+    temp_path = csv_file + '.tmp'
+    with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(kept)
+    os.replace(temp_path, csv_file)
+    return len(body) - len(kept)
+
+
+def write_summaries(articles: List[Dict], cache: SummaryCache, prompt: str, model: str, output_file: str) -> int:
+    """Write the cached summaries of the articles to output_file in input order."""
+    return write_records(output_file, summarized_records(articles, cache, prompt, model), indent=4)
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    """Answers generateContent requests with fake_reply()."""
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length))
+            reply = fake_reply(body["contents"][0]["parts"][0]["text"])
+        except (ValueError, KeyError, IndexError):
+            self.send_error(400)
+            return
+        payload = json.dumps({"candidates": [{"content": {"parts": [{"text": reply}]}}]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fake(port: int = FAKE_SERVER_PORT) -> None:
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeGeminiHandler)
+    print(f"Fake Gemini server on http://127.0.0.1:{port} (use --endpoint http://127.0.0.1:{port})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+def make_backend(name: str, model: str, endpoint: str):
+    if name == "fake":
+        return FakeBackend()
+    api_key = read_api_key()
+    if not api_key and endpoint == DEFAULT_ENDPOINT:
+        raise RuntimeError(f"No API key: set GEMINI_API_KEY or create {API_KEY_FILE}")
+    return GeminiBackend(model, api_key, endpoint)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Summarize today's articles in parallel batches",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python summarizer.py
+  python summarizer.py --workers 8 --requests-per-minute 30
+  python summarizer.py --backend fake
+  python summarizer.py fake-server --port 8766 &
+  python summarizer.py --endpoint http://127.0.0.1:8766
+        """
+    )
+    parser.add_argument('command', nargs='?', choices=['run', 'fake-server'], default='run',
+                        help='run (default) or start a local fake Gemini server')
+    parser.add_argument('--input', '-i', default=INPUT_FILE, help=f'Articles to summarize (default: {INPUT_FILE})')
+    parser.add_argument('--output', '-o', default=OUTPUT_FILE, help=f'Summarized articles (default: {OUTPUT_FILE})')
+    parser.add_argument(
+        '--database-in',
+        default=DATABASE_INPUT_FILE,
+        help=f'Daily database CSV the rows of failed articles are removed from (default: {DATABASE_INPUT_FILE})'
+    )
+    parser.add_argument('--backend', '-b', choices=BACKENDS, default='gemini', help='Model backend (default: gemini)')
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=f'Gemini model name (default: {DEFAULT_MODEL})')
+    parser.add_argument(
+        '--endpoint',
+        default=os.environ.get("GEMINI_ENDPOINT", DEFAULT_ENDPOINT),
+        help='Gemini API base URL (default: $GEMINI_ENDPOINT or the public API)'
+    )
+    parser.add_argument(
+        '--prompt',
+        default=DEFAULT_PROMPT_FILE,
+        help=f'Instructions sent ahead of each batch (default: {DEFAULT_PROMPT_FILE})'
+    )
+    parser.add_argument(
+        '--cache',
+        default=DEFAULT_CACHE_FILE,
+        help=f'Summary cache file (default: {DEFAULT_CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Batches in flight at once (default: {DEFAULT_WORKERS})'
+    )
+    parser.add_argument(
+        '--batch-tokens',
+        type=int,
+        default=DEFAULT_BATCH_TOKENS,
+        help=f'Estimated token budget of one batch prompt (default: {DEFAULT_BATCH_TOKENS})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Maximum articles per batch (default: {DEFAULT_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--requests-per-minute',
+        type=float,
+        default=DEFAULT_REQUESTS_PER_MINUTE,
+        help=f'Request rate limit, 0 for none (default: {DEFAULT_REQUESTS_PER_MINUTE})'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=DEFAULT_RETRIES,
+        help=f'Retries per article after its batch fails (default: {DEFAULT_RETRIES})'
+    )
+    parser.add_argument('--port', type=int, default=FAKE_SERVER_PORT, help='Port for fake-server')
+    args = parser.parse_args()
+
+    if args.command == 'fake-server':
+        serve_fake(args.port)
+        return
+
+    for path in (args.input, args.prompt):
+        if not os.path.exists(path):
+            print(f"Error: File '{path}' not found.")
+            sys.exit(1)
+
+    try:
+        backend = make_backend(args.backend, args.model, args.endpoint)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    prompt = read_prompt(args.prompt)
+    articles = list(iter_records(args.input))
+    cache = SummaryCache(args.cache)
+    start = time.perf_counter()
+    try:
+        summarized, failed = summarize_articles(
+            articles, backend, cache, prompt, args.workers, args.batch_tokens,
+            args.batch_size, args.requests_per_minute, args.retries)
+        written = write_summaries(articles, cache, prompt, backend.model, args.output)
+    finally:
+        cache.close()
+        backend.close()
+    print(f"Wrote {written} summarized articles to {args.output} "
+          f"({summarized} new, {len(failed)} failed) in {time.perf_counter() - start:.1f}s")
+    if failed:
+        removed = remove_rows(args.database_in, [article.get('URL', '') for article in failed])
+        print(f"{len(failed)} articles could not be summarized; removed {removed} of their rows "
+              f"from {args.database_in} so the next collection retries them:")
+        for article in failed:
+            print(f"  - {article.get('URL', '')}")
+        if not written:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
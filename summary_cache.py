@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Cache of LLM summaries keyed by what produced them.
+The key is the SHA-256 of (model, prompt file, article source text), so an
+article is only sent to the model again when its text, the prompt or the
+model changes. Entries live in an append-only JSON Lines file.
+
+The prompt step runs in three parts around the model call:
+  lookup - keep the full batch aside in contents-today.full.temp.json
+           and leave only cache misses in contents-today.temp.json
+           (removed when there are none); a batch set aside by an
+           earlier, failed run is kept
+  (model) - summarize contents-today.temp.json into contents-today.json
+  store  - cache the fresh results and write the full batch, cached and
+           fresh, back to contents-today.json
+The Makefile only runs store when the model call succeeded.
+`fake` is a local stand-in for the model call, for testing the pipeline
+without API quota.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from json_records import iter_records, write_records
+from url_index import normalize_url
+
+DEFAULT_CACHE_FILE = "summary-cache.jsonl"
+DEFAULT_PROMPT_FILE = "summary.prompt"
+DEFAULT_MODEL = "gemini-2.5-flash"
+INPUT_FILE = "contents-today.temp.json"
+FULL_FILE = "contents-today.full.temp.json"
+OUTPUT_FILE = "contents-today.json"
+
+
+def read_prompt(prompt_file: str) -> str:
+    with open(prompt_file, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def summary_key(source: str, prompt: str, model: str) -> str:
+    """Cache key of one article's summary."""
+    digest = hashlib.sha256()
+    for part in (model, hashlib.sha256(prompt.encode('utf-8')).hexdigest(), source):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def has_summary(record: Dict) -> bool:
+    return bool(record.get('summary')) and isinstance(record.get('questions'), list)
+
+
+class SummaryCache:
+    """key -> {"summary", "questions"} map persisted as an append-only JSON Lines file."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_FILE):
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash
+                        continue
+                    self.entries[record["key"]] = {"summary": record["summary"], "questions": record["questions"]}
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            return self.entries.get(key)
+
+    def put(self, key: str, summary: str, questions: List[str]) -> None:
+        with self._lock:
+            if self.entries.get(key) == {"summary": summary, "questions": questions}:
+                return
+            self.entries[key] = {"summary": summary, "questions": questions}
+            self._file.write(json.dumps({"key": key, "summary": summary, "questions": questions},
+                                        ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def summarized_record(article: Dict, cached: Dict) -> Dict:
+    """The contents-today.json record for an article and its cached summary."""
+    return {
+        "date": article.get('date', ''),
+        "URL": article.get('URL', ''),
+        "topic": article.get('topic', ''),
+        "source": article.get('source', ''),
+        "summary": cached["summary"],
+        "questions": cached["questions"],
+    }
+
+
+def lookup(cache: SummaryCache, prompt: str, model: str,
+           input_file: str = INPUT_FILE, full_file: str = FULL_FILE, output_file: str = OUTPUT_FILE):
+    """
+    Move the day's batch to full_file and leave only the cache misses in
+    input_file for the model; input_file is removed when nothing is left.
+    An existing full_file is kept: after a failed model call input_file
+    holds only the misses, so the batch is full_file plus any articles
+    collected since. Returns (hits, misses).
+    """
+    articles = list(iter_records(full_file)) if os.path.exists(full_file) else []
+    if os.path.exists(input_file):
+        seen = {normalize_url(article.get('URL', '')) for article in articles}
+        articles.extend(article for article in iter_records(input_file)
+                        if normalize_url(article.get('URL', '')) not in seen)
+    write_records(full_file, articles, indent=4)
+    # Articles without a source are skipped by the prompt anyway
+    misses = [article for article in articles
+              if article.get('source') and not cache.get(summary_key(article['source'], prompt, model))]
+    if os.path.exists(output_file):
+        # A stale result from an earlier run must not be mistaken for this batch's
+        os.remove(output_file)
+    if misses:
+        write_records(input_file, misses, indent=4)
+    elif os.path.exists(input_file):
+        os.remove(input_file)
+    hits = sum(1 for article in articles if article.get('source')) - len(misses)
+    return hits, len(misses)
+
+
+def store(cache: SummaryCache, prompt: str, model: str,
+          full_file: str = FULL_FILE, output_file: str = OUTPUT_FILE):
+    """
+    Cache the model's results from output_file and rewrite output_file with
+    the whole batch in its original order. Articles the model skipped are
+    left out, as before. Returns (cached, fresh).
+    """
+    results = {}
+    if os.path.exists(output_file):
+        results = {normalize_url(record.get('URL', '')): record for record in iter_records(output_file)}
+
+    merged = []
+    cached = fresh = 0
+    for article in iter_records(full_file):
+        source = article.get('source')
+        key = summary_key(source, prompt, model) if source else None
+        result = results.get(normalize_url(article.get('URL', '')))
+        if result is not None and has_summary(result):
+            if key:
+                cache.put(key, result['summary'], result['questions'])
+            merged.append(result)
+            fresh += 1
+            continue
+        hit = cache.get(key) if key else None
+        if hit:
+            merged.append(summarized_record(article, hit))
+            cached += 1
+
+    write_records(output_file, merged, indent=4)
+    os.remove(full_file)
+    return cached, fresh
+
+
+def fake_summary(article: Dict) -> Dict:
+    """Deterministic summary and questions standing in for the model's."""
+    topic = article.get('topic', '')
+    return {
+        "summary": f"Summary of {topic}: {article.get('source', '')[:200]}",
+        "questions": [f"What is the main point of '{topic}'?"],
+    }
+
+
+def fake_summarize(input_file: str = INPUT_FILE, output_file: str = OUTPUT_FILE) -> int:
+    """
+    Local stand-in for the model call: writes a deterministic summary and
+    questions for every article with a source. Returns the number written.
+    """
+    def summarize(articles):
+        for article in articles:
+            if article.get('source'):
+                yield summarized_record(article, fake_summary(article))
+    return write_records(output_file, summarize(iter_records(input_file)), indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reuse cached summaries so only new articles are sent to the model",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python summary_cache.py lookup
+  make -f gemini-cli-prompt.mk FILE=summary.prompt   # only when misses remain
+  python summary_cache.py store
+  python summary_cache.py fake                        # stand-in for the model call
+  python summary_cache.py stats
+        """
+    )
+    parser.add_argument('command', choices=['lookup', 'store', 'fake', 'stats'], help='Action to perform')
+    parser.add_argument(
+        '--cache',
+        default=DEFAULT_CACHE_FILE,
+        help=f'Summary cache file (default: {DEFAULT_CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--prompt',
+        default=DEFAULT_PROMPT_FILE,
+        help=f'Prompt file the summaries are generated with (default: {DEFAULT_PROMPT_FILE})'
+    )
+    parser.add_argument(
+        '--model',
+        default=DEFAULT_MODEL,
+        help=f'Model name the summaries are generated with (default: {DEFAULT_MODEL})'
+    )
+    args = parser.parse_args()
+
+    if args.command == 'fake':
+        if not os.path.exists(INPUT_FILE):
+            print(f"Nothing to summarize: {INPUT_FILE} not found.")
+            return
+        count = fake_summarize()
+        print(f"Fake summaries written for {count} articles to {OUTPUT_FILE}")
+        return
+
+    cache = SummaryCache(args.cache)
+    try:
+        if args.command == 'stats':
+            print(f"{len(cache)} cached summaries in {args.cache}")
+            return
+        if not os.path.exists(args.prompt):
+            print(f"Error: File '{args.prompt}' not found.")
+            sys.exit(1)
+        prompt = read_prompt(args.prompt)
+        if args.command == 'lookup':
+            if not os.path.exists(INPUT_FILE) and not os.path.exists(FULL_FILE):
+                print(f"Error: File '{INPUT_FILE}' not found.")
+                sys.exit(1)
+            hits, misses = lookup(cache, prompt, args.model)
+            print(f"Summary cache: {hits} hits, {misses} articles left for the model")
+        else:
+            if not os.path.exists(FULL_FILE):
+                print(f"Error: File '{FULL_FILE}' not found; run lookup first.")
+                sys.exit(1)
+            cached, fresh = store(cache, prompt, args.model)
+            print(f"Wrote {cached + fresh} articles to {OUTPUT_FILE} ({cached} from cache, {fresh} new)")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
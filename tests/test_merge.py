@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+
+import pytest
+
+from merge import (
+    append_at,
+    append_csv_data,
+    append_json_data,
+    journal_path,
+    load_csv_data,
+    merge_database_rows,
+    open_url_index,
+    recover_append,
+    save_csv_data,
+)
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+
+
+def rows(*numbers):
+    return [{"date": "2025-08-12", "URL": f"https://example.com/{n}", "topic": f"topic {n}"} for n in numbers]
+
+
+# Interrupted appends
+
+def test_recover_append_replays_a_torn_append(tmp_path):
+    path = str(tmp_path / "database.csv")
+    save_csv_data(path, rows(1))
+    original = read(path)
+    payload = "2025-08-12,https://example.com/2,topic 2\r\n"
+    # Crash after the journal was written but halfway through the data file
+    with open(journal_path(path), 'w', encoding='utf-8') as f:
+        json.dump({"offset": len(original), "payload": payload}, f)
+    write(path, original + payload[:10])
+
+    recover_append(path)
+
+    assert read(path) == original + payload
+    assert not os.path.exists(journal_path(path))
+
+
+def test_recover_append_discards_a_torn_journal(tmp_path):
+    path = str(tmp_path / "database.csv")
+    save_csv_data(path, rows(1))
+    original = read(path)
+    write(journal_path(path), '{"offset": 12, "payl')
+
+    recover_append(path)
+
+    assert read(path) == original
+    assert not os.path.exists(journal_path(path))
+
+
+def test_recover_append_without_journal_leaves_file_alone(tmp_path):
+    path = str(tmp_path / "database.csv")
+    save_csv_data(path, rows(1))
+    original = read(path)
+
+    recover_append(path)
+
+    assert read(path) == original
+
+
+def test_append_at_removes_its_journal(tmp_path):
+    path = str(tmp_path / "data.txt")
+    write(path, "abc]")
+
+    append_at(path, 3, ",d]")
+
+    assert read(path) == "abc,d]"
+    assert not os.path.exists(journal_path(path))
+
+
+def test_merge_finishes_an_interrupted_append_first(tmp_path):
+    path = str(tmp_path / "database.csv")
+    save_csv_data(path, rows(1))
+    original = read(path)
+    payload = "2025-08-12,https://example.com/2,topic 2\r\n"
+    with open(journal_path(path), 'w', encoding='utf-8') as f:
+        json.dump({"offset": len(original), "payload": payload}, f)
+    write(path, original + payload[:5])
+
+    added = merge_database_rows(rows(2, 3), path)
+
+    assert added == 1
+    assert [row["URL"] for row in load_csv_data(path)] == [f"https://example.com/{n}" for n in (1, 2, 3)]
+
+
+def test_append_csv_data_adds_missing_newline(tmp_path):
+    path = str(tmp_path / "database.csv")
+    write(path, "date,URL,topic\r\n2025-08-12,https://example.com/1,topic 1")
+
+    append_csv_data(path, rows(2))
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        assert [row["URL"] for row in csv.DictReader(f)] == ["https://example.com/1", "https://example.com/2"]
+
+
+# JSON array tail rewrite
+
+@pytest.mark.parametrize("existing", [[], [{"URL": "https://example.com/1", "topic": "one"}]])
+def test_append_json_data_matches_a_full_rewrite(tmp_path, existing):
+    path = str(tmp_path / "contents.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(existing, f, ensure_ascii=False, indent=2)
+    new = [{"URL": "https://example.com/2", "topic": "두 번째"}, {"URL": "https://example.com/3", "topic": "three"}]
+
+    append_json_data(path, new)
+
+    assert read(path) == json.dumps(existing + new, ensure_ascii=False, indent=2)
+
+
+@pytest.mark.parametrize("text", ["[]", "[ ]\n", "[\n]\n"])
+def test_append_json_data_to_an_empty_array(tmp_path, text):
+    path = str(tmp_path / "contents.json")
+    write(path, text)
+    new = [{"URL": "https://example.com/1"}]
+
+    append_json_data(path, new)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == new
+
+
+def test_append_json_data_twice(tmp_path):
+    path = str(tmp_path / "contents.json")
+    write(path, "[]")
+    first = [{"URL": "https://example.com/1"}]
+    second = [{"URL": "https://example.com/2"}]
+
+    append_json_data(path, first)
+    append_json_data(path, second)
+
+    assert read(path) == json.dumps(first + second, indent=2)
+
+
+def test_append_json_data_rejects_a_non_array(tmp_path):
+    path = str(tmp_path / "contents.json")
+    write(path, '{"URL": "https://example.com/1"}')
+
+    with pytest.raises(ValueError):
+        append_json_data(path, [{"URL": "https://example.com/2"}])
+
+
+def test_append_json_data_to_jsonl(tmp_path):
+    path = str(tmp_path / "contents.jsonl")
+    write(path, '{"URL": "https://example.com/1"}')
+
+    append_json_data(path, [{"URL": "https://example.com/2"}])
+
+    assert read(path) == '{"URL": "https://example.com/1"}\n{"URL": "https://example.com/2"}\n'
+
+
+# URL index staleness
+
+def test_url_index_is_kept_current_by_merges(tmp_path, capsys):
+    path = str(tmp_path / "database.csv")
+    merge_database_rows(rows(1, 2), path)
+    merge_database_rows(rows(2, 3), path)
+    capsys.readouterr()
+
+    index = open_url_index(path)
+    try:
+        assert "Building URL index" not in capsys.readouterr().out
+        assert len(index) == 3
+        assert "https://example.com/3" in index
+    finally:
+        index.close()
+
+
+def test_url_index_is_rebuilt_after_an_outside_edit(tmp_path):
+    path = str(tmp_path / "database.csv")
+    merge_database_rows(rows(1), path)
+    # Another tool appends a row without updating the index
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        f.write("2025-08-12,https://example.com/2,topic 2\r\n")
+
+    index = open_url_index(path)
+    try:
+        assert "https://example.com/2" in index
+    finally:
+        index.close()
+    assert merge_database_rows(rows(2), path) == 0
+
+
+def test_url_index_forgets_rows_removed_from_the_file(tmp_path):
+    path = str(tmp_path / "database.csv")
+    merge_database_rows(rows(1, 2), path)
+    save_csv_data(path, rows(1))
+
+    index = open_url_index(path)
+    try:
+        assert "https://example.com/2" not in index
+    finally:
+        index.close()
+    assert merge_database_rows(rows(2), path) == 1
+
+
+def test_readonly_url_index_does_not_write(tmp_path):
+    path = str(tmp_path / "database.csv")
+    save_csv_data(path, rows(1))
+
+    index = open_url_index(path, readonly=True)
+    try:
+        assert "https://example.com/1" in index
+    finally:
+        index.close()
+    assert sorted(os.listdir(tmp_path)) == ["database.csv"]
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Source-text trimming before summarization.
+get_main_content() keeps every text line of the page, including newsletter
+prompts, share buttons and related-link lists. This stage drops such lines:
+short lines matching known boilerplate phrases, and short lines that repeat
+across several articles from the same site. It then truncates each source to
+a token budget at a line boundary. Sizes before and after are reported per
+article.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from json_records import iter_records, write_records
+
+DEFAULT_MAX_TOKENS = 3000
+BOILERPLATE_MAX_WORDS = 6
+REPEATED_LINE_MIN_ARTICLES = 3
+# Each alternative must cover the whole line, so prose that merely starts
+# with one of these words ("Trending data shows ...") is kept.
+BOILERPLATE_PATTERNS = re.compile(
+    r'^(?:'
+    r'sign up(?: for (?:our|the) newsletter)?|subscribe(?: now| today| to (?:our|the) newsletter)?|'
+    r'(?:our |the )?newsletter|advertisement|sponsored(?: content)?|read (?:more|next)|see also|'
+    r'related(?: articles| stories| posts| content)?|more from(?: [\w.&\'-]+){1,3}|share (?:this(?: article| story)?|on \w+)|'
+    r'follow us(?: on \w+)?|click here|(?:image )?credits?: .+|photo: .+|'
+    r'this article (?:was )?originally (?:appeared|published) (?:on|in) .+|all rights reserved|'
+    r'most popular|trending(?: now| stories)?|recommended(?: for you| stories)?|'
+    r'(?:\d+ )?comments?'
+    r')\b[\s.:!>»›|-]*$',
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _is_short(line: str) -> bool:
+    return len(line.split()) <= BOILERPLATE_MAX_WORDS
+
+
+def repeated_lines(articles: List[Dict], min_articles: int = REPEATED_LINE_MIN_ARTICLES) -> Dict[str, set]:
+    """
+    Short lines found in at least min_articles articles of the same host, per
+    host. Two articles alone (a follow-up quoting its original) are not enough.
+    """
+    counts = defaultdict(Counter)
+    for article in articles:
+        host = urlparse(article.get('URL', '')).netloc.lower()
+        lines = {line.strip() for line in article.get('source', '').splitlines()}
+        counts[host].update(line for line in lines if line and _is_short(line))
+    return {host: {line for line, count in counter.items() if count >= min_articles}
+            for host, counter in counts.items()}
+
+
+def clean_source(text: str, boilerplate: Optional[set] = None) -> str:
+    """Drop blank, duplicate and boilerplate lines from one article's text."""
+    boilerplate = boilerplate or set()
+    kept = []
+    seen = set()
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line in seen or line in boilerplate:
+            continue
+        if _is_short(line) and BOILERPLATE_PATTERNS.match(line):
+            continue
+        seen.add(line)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def truncate_to_budget(text: str, max_tokens: Optional[int]) -> str:
+    """Cut text to about max_tokens at a line boundary (mid-line only if the first line is too long)."""
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * 4
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars]
+
+
+def trim_articles(articles: List[Dict], max_tokens: Optional[int] = DEFAULT_MAX_TOKENS) -> List[Dict]:
+    """
+    Trim the source of every article in place.
+    Returns one report entry per article with its size before and after.
+    """
+    boilerplate = repeated_lines(articles)
+    report = []
+    for article in articles:
+        source = article.get('source') or ''
+        host = urlparse(article.get('URL', '')).netloc.lower()
+        trimmed = truncate_to_budget(clean_source(source, boilerplate.get(host)), max_tokens)
+        article['source'] = trimmed
+        report.append({
+            "URL": article.get('URL', ''),
+            "chars_before": len(source),
+            "chars_after": len(trimmed),
+            "tokens_before": estimate_tokens(source) if source else 0,
+            "tokens_after": estimate_tokens(trimmed) if trimmed else 0,
+        })
+    return report
+
+
+def summarize_report(report: List[Dict]) -> Tuple[int, int]:
+    """Total estimated tokens (before, after) over a report."""
+    return sum(entry["tokens_before"] for entry in report), sum(entry["tokens_after"] for entry in report)
+
+
+def save_report(report: List[Dict], report_file: str) -> None:
+    before, after = summarize_report(report)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({"tokens_before": before, "tokens_after": after, "articles": report}, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Remove boilerplate from article sources and cut them to a token budget",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python text_budget.py
+  python text_budget.py --max-tokens 2000 --report text-budget.json
+  python text_budget.py -i contents.json -o contents-trimmed.json --max-tokens 0
+        """
+    )
+    parser.add_argument(
+        '--input', '-i',
+        default='contents-today.temp.json',
+        help='Articles to trim (default: contents-today.temp.json)'
+    )
+    parser.add_argument('--output', '-o', help='Output file (default: overwrite the input)')
+    parser.add_argument(
+        '--max-tokens',
+        type=int,
+        default=DEFAULT_MAX_TOKENS,
+        help=f'Estimated token budget per article source, 0 for no limit (default: {DEFAULT_MAX_TOKENS})'
+    )
+    parser.add_argument('--report', metavar='FILE', help='Write per-article sizes before and after to this JSON file')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Error: File '{args.input}' not found.")
+        sys.exit(1)
+
+    articles = list(iter_records(args.input))
+    report = trim_articles(articles, args.max_tokens or None)
+    output = args.output or args.input
+    write_records(output, articles, indent=4)
+    before, after = summarize_report(report)
+    print(f"Trimmed {len(articles)} articles: ~{before} -> ~{after} tokens, written to {output}")
+    if args.report:
+        save_report(report, args.report)
+        print(f"Report written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
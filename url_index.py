@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Persistent URL index used for deduplication.
+Normalized URLs are stored as 8-byte hashes in a sorted sidecar file that is
+memory-mapped and binary-searched, plus a small append-only log of recent
+additions that is folded into the sorted file once it grows.
+"""
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import sys
+from typing import Callable, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+HASH_SIZE = 8
+COMPACT_THRESHOLD = 4096
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ref', 'ref_src', 'ref_url', 'cmpid', 'ncid', 'guccounter', 'guce_referrer', 'guce_referrer_sig',
+    '_hsenc', '_hsmi', 'mkt_tok', 'sr_share', 'taid', 'yptr',
+}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form of a URL for deduplication.
+    Ignores the http/https scheme, a leading www., default ports, fragments,
+    trailing slashes and tracking query parameters (utm_* and friends).
+    """
+    url = url.strip()
+    if not url:
+        return ''
+    parts = urlsplit(url if '://' in url else '//' + url)
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip('/')
+    params = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+              if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS]
+    query = urlencode(sorted(params))
+    return host + path + ('?' + query if query else '')
+
+
+def url_hash(url: str) -> bytes:
+    """Fixed-size hash of a normalized URL."""
+    return hashlib.blake2b(normalize_url(url).encode('utf-8'), digest_size=HASH_SIZE).digest()
+
+
+class UrlIndex:
+    """
+    Set of normalized URLs kept next to a data file (database.csv.urlidx ...).
+    The index remembers the data file's size; when the file changed behind its
+    back the index is rebuilt from the file's URLs.
+    """
+
+    def __init__(self, data_file: str, readonly: bool = False):
+        self.data_file = data_file
+        self.readonly = readonly
+        self.sorted_path = data_file + '.urlidx'
+        self.log_path = data_file + '.urlidx.log'
+        self.meta_path = data_file + '.urlidx.meta'
+        self._recent = set()
+        self._pending = []
+        self._map = None
+        self._count = 0
+
+    @classmethod
+    def open(cls, data_file: str, iter_urls: Callable[[], Iterable[str]], readonly: bool = False) -> 'UrlIndex':
+        """
+        Open the index for data_file, rebuilding it from iter_urls() when it is
+        missing or stale. A readonly index never writes to disk; a stale one is
+        then built in memory only.
+        """
+        index = cls(data_file, readonly)
+        if index._is_current():
+            index._load()
+        else:
+            if os.path.exists(data_file):
+                print(f"Building URL index for {data_file}...")
+            index.rebuild(iter_urls())
+        return index
+
+    def _data_size(self) -> int:
+        return os.path.getsize(self.data_file) if os.path.exists(self.data_file) else 0
+
+    def _is_current(self) -> bool:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return False
+        return os.path.exists(self.sorted_path) and meta.get("data_size") == self._data_size()
+
+    def _load(self) -> None:
+        size = os.path.getsize(self.sorted_path)
+        self._count = size // HASH_SIZE
+        if size:
+            with open(self.sorted_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % HASH_SIZE
+            self._recent = {data[i:i + HASH_SIZE] for i in range(0, usable, HASH_SIZE)}
+
+    def _sorted_contains(self, key: bytes) -> bool:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            value = self._map[middle * HASH_SIZE:(middle + 1) * HASH_SIZE]
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                return True
+        return False
+
+    def __contains__(self, url: str) -> bool:
+        key = url_hash(url)
+        return key in self._recent or (self._map is not None and self._sorted_contains(key))
+
+    def __len__(self) -> int:
+        return self._count + len(self._recent)
+
+    def add(self, url: str) -> bool:
+        """Add a URL; returns False when it (or an equivalent URL) was already present."""
+        if url in self:
+            return False
+        key = url_hash(url)
+        self._recent.add(key)
+        self._pending.append(key)
+        return True
+
+    def _close_map(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _write_sorted(self, keys: Iterable[bytes]) -> None:
+        keys = sorted(set(keys))
+        temp_path = self.sorted_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(b''.join(keys))
+            f.flush()
+            os.fsync(f.fileno())
+        self._close_map()
+        os.replace(temp_path, self.sorted_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+
+    def _all_keys(self) -> Iterable[bytes]:
+        if self._map is not None:
+            for i in range(self._count):
+                yield self._map[i * HASH_SIZE:(i + 1) * HASH_SIZE]
+        yield from self._recent
+
+    def rebuild(self, urls: Iterable[str]) -> None:
+        """Replace the index contents with the given URLs."""
+        keys = {url_hash(url) for url in urls if url}
+        self._close_map()
+        self._pending = []
+        if self.readonly:
+            self._recent = keys
+            self._count = 0
+            return
+        self._recent = set()
+        self._write_sorted(keys)
+        self._write_meta()
+        self._load()
+
+    def _write_meta(self) -> None:
+        temp_path = self.meta_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"data_size": self._data_size(), "count": len(self)}, f)
+        os.replace(temp_path, self.meta_path)
+
+    def save(self) -> None:
+        """
+        Persist the URLs added since the last save and record the data file's
+        current size. Call it after the data file itself has been written.
+        """
+        if self.readonly:
+            return
+        if self._pending:
+            with open(self.log_path, 'ab') as f:
+                f.write(b''.join(self._pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+        if len(self._recent) > COMPACT_THRESHOLD:
+            self._write_sorted(list(self._all_keys()))
+            self._recent = set()
+            self._load()
+        self._write_meta()
+
+    def close(self) -> None:
+        self._close_map()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or query the URL index of a database/contents file",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python url_index.py rebuild database.csv
+  python url_index.py check database.csv https://techcrunch.com/2025/08/03/apple-might-be-building-its-own-ai-answer-engine/
+        """
+    )
+    parser.add_argument('command', choices=['rebuild', 'check'], help='Action to perform')
+    parser.add_argument('data_file', help='database CSV or contents JSON file')
+    parser.add_argument('urls', nargs='*', help='URLs to look up (check)')
+    args = parser.parse_args()
+
+    # Imported here so merge.py can import this module without a cycle
+    from merge import iter_record_urls
+
+    if not os.path.exists(args.data_file):
+        print(f"Error: File '{args.data_file}' not found.")
+        sys.exit(1)
+
+    if args.command == 'rebuild':
+        index = UrlIndex(args.data_file)
+        index.rebuild(iter_record_urls(args.data_file))
+        print(f"Indexed {len(index)} URLs from {args.data_file}")
+        index.close()
+        return
+
+    index = UrlIndex.open(args.data_file, lambda: iter_record_urls(args.data_file), readonly=True)
+    for url in args.urls:
+        state = "present" if url in index else "absent"
+        print(f"{state}: {url} ({normalize_url(url)})")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()